@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+CUBE_DIMS = ['state', 'date', 'risk_label', 'is_suspicious']
+LOSS_BINS = 30
+
+
+def build_cube(df):
+    """state × date × risk_label × is_suspicious with additive measures, so
+    every KPI and chart can be answered by summing a few hundred rows."""
+    dims = [c for c in CUBE_DIMS if c in df.columns]
+    measures = df[dims].assign(
+        rows=1,
+        loss_sum=df['loss_percentage'].to_numpy(dtype=float),
+        smart_meters=(df['smart_meter_installed'].astype(bool).to_numpy()
+                      if 'smart_meter_installed' in df.columns else 0),
+        age_sum=(df['transformer_age_years'].to_numpy(dtype=float)
+                 if 'transformer_age_years' in df.columns else np.nan),
+    )
+    return (measures.groupby(dims, observed=True, sort=False)
+                    .sum()
+                    .reset_index())
+
+
+def loss_histogram(df, nbins=LOSS_BINS):
+    counts, edges = np.histogram(df['loss_percentage'].to_numpy(), bins=nbins)
+    return pd.DataFrame({'loss_percentage': (edges[:-1] + edges[1:]) / 2,
+                         'count': counts, 'width': np.diff(edges)})
+
+
+def build_aggregates(df):
+    return {'cube': build_cube(df), 'loss_hist': loss_histogram(df), 'rows': len(df)}
+
+
+# ── Queries ───────────────────────────────────────────────────────
+def _mean(part):
+    rows = part['rows'].sum()
+    return part['loss_sum'].sum() / rows if rows else float('nan')
+
+
+def avg_loss(cube, suspicious=None):
+    if suspicious is not None:
+        cube = cube[cube['is_suspicious'] == suspicious]
+    return _mean(cube)
+
+
+def suspicious_count(cube):
+    return int(cube.loc[cube['is_suspicious'], 'rows'].sum())
+
+
+def risk_counts(cube):
+    counts = cube.groupby('risk_label', observed=True)['rows'].sum()
+    return {label: int(counts.get(label, 0)) for label in ['HIGH', 'MEDIUM', 'LOW']}
+
+
+def avg_transformer_age(cube):
+    return cube['age_sum'].sum() / max(cube['rows'].sum(), 1)
+
+
+def state_loss(cube):
+    g = cube.groupby('state', observed=True)[['loss_sum', 'rows']].sum()
+    return (g['loss_sum'] / g['rows']).rename('loss_percentage')
+
+
+def daily_loss(cube):
+    g = cube.groupby('date', observed=True)[['loss_sum', 'rows']].sum().sort_index()
+    return (g['loss_sum'] / g['rows']).rename('loss_percentage').reset_index()
+
+
+def smart_meter_counts(cube):
+    installed = int(cube['smart_meters'].sum())
+    return pd.DataFrame({'Installed': ['Smart Meter ✅', 'No Smart Meter ❌'],
+                         'Count': [installed, int(cube['rows'].sum()) - installed]})
+
+
+def state_summary(cube, state):
+    part = cube[cube['state'] == state]
+    return {'avg_loss': _mean(part),
+            'suspicious_count': suspicious_count(part),
+            'high_risk_count': risk_counts(part)['HIGH']}
+
+
+def context(aggs):
+    cube = aggs['cube']
+    by_state = state_loss(cube)
+    loss = avg_loss(cube)
+    return {
+        'avg_loss':         loss,
+        'suspicious_count': suspicious_count(cube),
+        'high_risk_count':  risk_counts(cube)['HIGH'],
+        'worst_state':      by_state.idxmax(),
+        'best_state':       by_state.idxmin(),
+        'revenue_loss':     round(loss * 847 / 18, 0),
+        'total_readings':   aggs['rows'],
+    }
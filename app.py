@@ -1,10 +1,16 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+# plotly, sklearn and the Gemini client are imported inside the pages that
+# use them; cold-start cost is in `python benchmark.py --imports`.
+
+# Sessions share one dataframe (see get_refresher); copy-on-write keeps any
+# accidental mutation local to the session that made it.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 # ── MUST be first ────────────────────────────────────────────────
 st.set_page_config(page_title="GridSense AI", layout="wide",
                    page_icon="⚡", initial_sidebar_state="auto")
@@ -17,49 +23,52 @@ from theme import (inject_theme, topbar, kpi_row, section_divider,
                    theme_toggle, chart_title, info_banner)
 inject_theme()
 
-from giip_page      import show_giip_page
-from data_generator import generate_grid_data
-from ml_models      import prepare_data
-from gemini_engine  import get_feeder_recommendation, get_state_strategy, ask_gridsense
+from data_service   import DataRefresher
+import aggregates as agg
+from charts         import (decimate, density_figure, sample_note, cached_figure,
+                            POINT_BUDGET, BUDGET_OPTIONS)
+from tables         import paged_table
 
 # ── Data ──────────────────────────────────────────────────────────
-@st.cache_data
-def load_data():
-    try:    df = pd.read_csv('grid_data.csv')
-    except: df = generate_grid_data()
-    return prepare_data(df)
-
-df = load_data()
-
-ctx = {
-    'avg_loss':        df['loss_percentage'].mean(),
-    'suspicious_count':int(df['is_suspicious'].sum()),
-    'high_risk_count': int((df['risk_label'] == 'HIGH').sum()),
-    'worst_state':     df.groupby('state')['loss_percentage'].mean().idxmax(),
-    'best_state':      df.groupby('state')['loss_percentage'].mean().idxmin(),
-    'revenue_loss':    round(df['loss_percentage'].mean() * 847 / 18, 0),
-    'total_readings':  len(df),
-    'last_updated':    datetime.now().strftime("%H:%M:%S"),
-}
+# One refresher per server process. It serves a shared, memory-mapped,
+# already-scored dataframe plus its aggregate cube, and rebuilds both in a
+# background thread — no request ever waits on a reload.
+@st.cache_resource
+def get_refresher():
+    return DataRefresher()
+
+refresher = get_refresher()
+data      = refresher.current()
+df        = data.df
+aggs      = data.aggs
+cube      = aggs['cube']
 
 def col_name(candidates, df):
     for c in candidates:
         if c in df.columns: return c
     return None
 
+def figure(chart_id, build, *params):
+    # Built once per data version and theme, then shared by every session
+    theme = "dark" if st.session_state.get("dark_mode", True) else "light"
+    return cached_figure((chart_id, data.version, theme, *params), build)
+
 # ── Sidebar ───────────────────────────────────────────────────────
-sidebar_brand(total_readings=len(df), data_source="CSV")
+sidebar_brand(total_readings=len(df), data_source=data.source)
 
-# Navigation — clean dict mapping avoids icon/space matching bugs
+# Navigation — clean dict mapping avoids icon/space matching bugs.
+# Each page lists the derived views it reads (data_service.DERIVED); only
+# those are computed, once per data version, when the page is opened.
 PAGES = {
-    "🏠 Dashboard":          "Dashboard",
-    "🚨 Anomaly Detection":  "Anomaly",
-    "🔧 Asset Risk":         "Risk",
-    "🤖 AI Recommendations": "AI",
-    "🏛️ GIIP Framework":     "GIIP",
-    "💬 Ask GridSense AI":   "Chat",
+    "🏠 Dashboard":          ("Dashboard", ['context', 'state_loss', 'daily_loss', 'smart_meters']),
+    "🚨 Anomaly Detection":  ("Anomaly",   ['context']),
+    "🔧 Asset Risk":         ("Risk",      ['risk', 'avg_transformer_age']),
+    "🤖 AI Recommendations": ("AI",        ['suspicious_feeders', 'state_loss']),
+    "🏛️ GIIP Framework":     ("GIIP",      []),
+    "💬 Ask GridSense AI":   ("Chat",      ['context']),
 }
-page = PAGES[st.sidebar.radio("", list(PAGES.keys()), label_visibility="collapsed")]
+page, needs = PAGES[st.sidebar.radio("", list(PAGES.keys()), label_visibility="collapsed")]
+d = data.inputs(needs)
 
 st.sidebar.markdown("---")
 st.sidebar.markdown(f"""
@@ -71,15 +80,23 @@ st.sidebar.markdown(f"""
   <div class="status-row status-ok" style="margin-bottom:6px"><div class="status-dot"></div>{len(df):,} records loaded</div>
 </div>""", unsafe_allow_html=True)
 
-if st.sidebar.button("🔄 Refresh Data"):
-    st.cache_data.clear()
-    st.rerun()
+if st.sidebar.button("🔄 Refresh Data", disabled=refresher.building):
+    refresher.refresh()
+    st.toast("Rebuilding data in the background — current data stays live")
+if refresher.building:
+    st.sidebar.caption("⏳ Rebuilding data…")
+if refresher.last_error:
+    st.sidebar.caption(f"⚠️ Last refresh failed: {refresher.last_error}")
+
+st.sidebar.markdown("<div style='font-size:0.67rem;color:var(--text-muted);font-family:var(--font-mono);text-transform:uppercase;letter-spacing:1px;margin:8px 0'>Charts</div>", unsafe_allow_html=True)
+point_budget = st.sidebar.select_slider("Scatter point budget", BUDGET_OPTIONS, value=POINT_BUDGET)
+chart_mode   = st.sidebar.radio("Large scatter plots", ["Sampled", "Density"], horizontal=True)
 
 theme_toggle()
 
 st.sidebar.markdown(f"""
 <div style="font-family:var(--font-mono);font-size:0.64rem;color:var(--text-muted);padding:4px 0">
-  Updated {datetime.now().strftime('%H:%M:%S')}
+  Data v{data.version} · built {data.built_at.strftime('%H:%M:%S')}
 </div>""", unsafe_allow_html=True)
 
 
@@ -87,14 +104,17 @@ st.sidebar.markdown(f"""
 # PAGE: Dashboard
 # ════════════════════════════════════════════════════════════════
 if page == "Dashboard":
+    import plotly.express as px
+    import plotly.graph_objects as go
     topbar("Dashboard", "GridSense AI  /  Overview")
+    ctx = d['context']
 
     kpi_row([
-        {"label":"Avg T&D Loss",      "value":f"{df['loss_percentage'].mean():.1f}%",
+        {"label":"Avg T&D Loss",      "value":f"{ctx['avg_loss']:.1f}%",
          "delta":"↑ Target: 2%",         "color":"red",    "icon":"📉"},
-        {"label":"Theft Suspects",    "value":str(int(df['is_suspicious'].sum())),
+        {"label":"Theft Suspects",    "value":str(ctx['suspicious_count']),
          "delta":"ML flagged",            "color":"orange", "icon":"🚨"},
-        {"label":"High-Risk Assets",  "value":str(int((df['risk_label']=='HIGH').sum())),
+        {"label":"High-Risk Assets",  "value":str(ctx['high_risk_count']),
          "delta":"Replace / maintain",    "color":"purple", "icon":"⚠️"},
         {"label":"Revenue Lost / yr", "value":f"₹{ctx['revenue_loss']:.0f}Cr",
          "delta":"Recoverable with GIIP", "color":"green",  "icon":"💰"},
@@ -108,39 +128,39 @@ if page == "Dashboard":
     with col1:
         # ── Title then chart in same column — no wrapping div needed ──
         chart_title("State-wise Average Loss %", "LIVE", "badge-live")
-        state_data = (df.groupby('state')['loss_percentage']
-                        .mean().reset_index()
-                        .sort_values('loss_percentage', ascending=False))
-        fig = px.bar(state_data, x='state', y='loss_percentage',
-                     color='loss_percentage',
-                     color_continuous_scale=["#00C87A","#F0B429","#E8304A"],
-                     labels={"loss_percentage":"Loss %","state":""})
-        fig.add_hline(y=2, line_dash="dash", line_color="#00C87A",
-                      annotation_text="2030 Target", annotation_font_color="#00C87A")
-        fig.update_layout(coloraxis_showscale=False, xaxis_tickangle=-25)
-        plotly_dark_layout(fig, 320)
-        st.plotly_chart(fig, use_container_width=True)
+        def state_loss_fig():
+            fig = px.bar(d['state_loss'].reset_index(), x='state', y='loss_percentage',
+                         color='loss_percentage',
+                         color_continuous_scale=["#00C87A","#F0B429","#E8304A"],
+                         labels={"loss_percentage":"Loss %","state":""})
+            fig.add_hline(y=2, line_dash="dash", line_color="#00C87A",
+                          annotation_text="2030 Target", annotation_font_color="#00C87A")
+            fig.update_layout(coloraxis_showscale=False, xaxis_tickangle=-25)
+            return plotly_dark_layout(fig, 320)
+        st.plotly_chart(figure('state_loss', state_loss_fig), use_container_width=True)
 
     with col2:
         chart_title("National Loss Trend")
-        date_col = col_name(['date'], df)
-        if date_col:
-            daily = df.groupby(date_col)['loss_percentage'].mean().reset_index()
-            fig2 = go.Figure()
-            fig2.add_trace(go.Scatter(
-                x=daily[date_col], y=daily['loss_percentage'],
-                mode='lines', fill='tozeroy',
-                line=dict(color='#0099E6', width=2.5),
-                fillcolor='rgba(0,153,230,0.08)'))
-            fig2.add_hline(y=2, line_dash="dash", line_color="#00C87A",
-                           annotation_text="Target", annotation_font_color="#00C87A")
-        else:
-            fig2 = px.histogram(df, x='loss_percentage', nbins=30,
-                                color_discrete_sequence=['#0099E6'],
-                                labels={"loss_percentage":"Loss %"})
-            fig2.add_vline(x=2, line_dash="dash", line_color="#00C87A")
-        plotly_dark_layout(fig2, 320)
-        st.plotly_chart(fig2, use_container_width=True)
+        date_col = col_name(['date'], cube)
+        def loss_trend_fig():
+            if date_col:
+                daily = d['daily_loss']
+                fig2 = go.Figure()
+                fig2.add_trace(go.Scatter(
+                    x=daily[date_col], y=daily['loss_percentage'],
+                    mode='lines', fill='tozeroy',
+                    line=dict(color='#0099E6', width=2.5),
+                    fillcolor='rgba(0,153,230,0.08)'))
+                fig2.add_hline(y=2, line_dash="dash", line_color="#00C87A",
+                               annotation_text="Target", annotation_font_color="#00C87A")
+            else:
+                fig2 = px.bar(aggs['loss_hist'], x='loss_percentage', y='count',
+                              color_discrete_sequence=['#0099E6'],
+                              labels={"loss_percentage":"Loss %"})
+                fig2.update_traces(width=aggs['loss_hist']['width'])
+                fig2.add_vline(x=2, line_dash="dash", line_color="#00C87A")
+            return plotly_dark_layout(fig2, 320)
+        st.plotly_chart(figure('loss_trend', loss_trend_fig), use_container_width=True)
 
     section_divider("Coverage & Distribution")
     col3, col4 = st.columns(2)
@@ -148,48 +168,48 @@ if page == "Dashboard":
     with col3:
         meter_col = col_name(['smart_meter_installed','smart_meter'], df)
         if meter_col:
-            md = df[meter_col].value_counts().reset_index()
-            md.columns = ['Installed','Count']
-            md['Installed'] = md['Installed'].map(
-                {True:'Smart Meter ✅', False:'No Smart Meter ❌',
-                 1:'Smart Meter ✅',    0:'No Smart Meter ❌'})
             chart_title("Smart Meter Coverage")
-            fig3 = px.pie(md, values='Count', names='Installed', color='Installed',
-                          color_discrete_map={
-                              'Smart Meter ✅':'#00C87A',
-                              'No Smart Meter ❌':'#E8304A'}, hole=0.52)
-            fig3.update_traces(textfont_color='#E8F0F8')
-            plotly_dark_layout(fig3, 260)
-            st.plotly_chart(fig3, use_container_width=True)
+            def smart_meter_fig():
+                fig3 = px.pie(d['smart_meters'], values='Count', names='Installed', color='Installed',
+                              color_discrete_map={
+                                  'Smart Meter ✅':'#00C87A',
+                                  'No Smart Meter ❌':'#E8304A'}, hole=0.52)
+                fig3.update_traces(textfont_color='#E8F0F8')
+                return plotly_dark_layout(fig3, 260)
+            st.plotly_chart(figure('smart_meters', smart_meter_fig), use_container_width=True)
 
     with col4:
         chart_title("Loss % Distribution")
-        fig4 = px.histogram(df, x='loss_percentage', nbins=30,
-                            color_discrete_sequence=['#7B5EA7'],
-                            labels={"loss_percentage":"Loss %"})
-        fig4.add_vline(x=2, line_dash="dash", line_color="#00C87A",
-                       annotation_text="2% Target", annotation_font_color="#00C87A")
-        plotly_dark_layout(fig4, 260)
-        st.plotly_chart(fig4, use_container_width=True)
+        def loss_hist_fig():
+            fig4 = px.bar(aggs['loss_hist'], x='loss_percentage', y='count',
+                          color_discrete_sequence=['#7B5EA7'],
+                          labels={"loss_percentage":"Loss %"})
+            fig4.update_traces(width=aggs['loss_hist']['width'])
+            fig4.add_vline(x=2, line_dash="dash", line_color="#00C87A",
+                           annotation_text="2% Target", annotation_font_color="#00C87A")
+            return plotly_dark_layout(fig4, 260)
+        st.plotly_chart(figure('loss_hist', loss_hist_fig), use_container_width=True)
 
 
 # ════════════════════════════════════════════════════════════════
 # PAGE: Anomaly Detection
 # ════════════════════════════════════════════════════════════════
 elif page == "Anomaly":
+    import plotly.express as px
     topbar("Anomaly Detection", "GridSense AI  /  Theft & Anomaly")
+    ctx = d['context']
     info_banner("🤖 <strong>Isolation Forest</strong> ML model flags feeders with suspicious consumption patterns indicating possible theft or meter tampering.", "cyan")
 
     kpi_row([
         {"label":"Suspicious Feeders",
-         "value":str(int(df['is_suspicious'].sum())),
+         "value":str(ctx['suspicious_count']),
          "delta":"ML flagged","color":"red","icon":"🚨"},
         {"label":"Normal Feeders",
-         "value":str(int((~df['is_suspicious']).sum())),
+         "value":str(ctx['total_readings'] - ctx['suspicious_count']),
          "delta":"Clean","color":"green","icon":"✅"},
         {"label":"Avg Loss (Suspicious)",
-         "value":(f"{df[df['is_suspicious']]['loss_percentage'].mean():.1f}%"
-                  if df['is_suspicious'].any() else "N/A"),
+         "value":(f"{agg.avg_loss(cube, suspicious=True):.1f}%"
+                  if ctx['suspicious_count'] else "N/A"),
          "delta":"vs national avg","color":"orange","icon":"📊"},
         {"label":"Detection Model",
          "value":"IF","delta":"Isolation Forest","color":"cyan","icon":"🤖"},
@@ -203,26 +223,46 @@ elif page == "Anomaly":
     with col1:
         if inj_col:
             chart_title("🔴 Red = Suspicious Feeders", "ML", "badge-ml")
-            fig = px.scatter(df, x=inj_col, y='loss_percentage',
-                             color='is_suspicious',
-                             color_discrete_map={True:'#E8304A', False:'#00C87A'},
-                             hover_data=['feeder_id','state'],
-                             labels={inj_col:"Units Injected (kWh)",
-                                     "loss_percentage":"Loss %",
-                                     "is_suspicious":"Suspicious"})
-            plotly_dark_layout(fig, 300)
+            labels = {inj_col:"Units Injected (kWh)",
+                      "loss_percentage":"Loss %",
+                      "is_suspicious":"Suspicious"}
+            def loss_scatter_fig():
+                note = ""
+                if chart_mode == "Density":
+                    fig = density_figure(df, inj_col, 'loss_percentage', df['is_suspicious'],
+                                         budget=point_budget, labels=labels)
+                else:
+                    pts = decimate(df, inj_col, 'loss_percentage', point_budget, keep=df['is_suspicious'])
+                    fig = px.scatter(pts, x=inj_col, y='loss_percentage',
+                                     color='is_suspicious',
+                                     color_discrete_map={True:'#E8304A', False:'#00C87A'},
+                                     hover_data=['feeder_id','state'], labels=labels)
+                    note = sample_note(len(pts), len(df), int(df['is_suspicious'].sum()))
+                return plotly_dark_layout(fig, 300), note
+            fig, note = figure('loss_scatter', loss_scatter_fig, chart_mode, point_budget)
+            if note: st.caption(note)
             st.plotly_chart(fig, use_container_width=True)
 
     with col2:
         if age_col and 'voltage_fluctuation' in df.columns:
             chart_title("Age vs Voltage Fluctuation")
-            fig2 = px.scatter(df, x=age_col, y='voltage_fluctuation',
-                              color='is_suspicious',
-                              color_discrete_map={True:'#E8304A', False:'#00C87A'},
-                              hover_data=['feeder_id','state'],
-                              labels={age_col:"Transformer Age (yrs)",
-                                      "voltage_fluctuation":"Voltage Fluctuation %"})
-            plotly_dark_layout(fig2, 300)
+            labels = {age_col:"Transformer Age (yrs)",
+                      "voltage_fluctuation":"Voltage Fluctuation %"}
+            def voltage_scatter_fig():
+                note = ""
+                if chart_mode == "Density":
+                    fig2 = density_figure(df, age_col, 'voltage_fluctuation', df['is_suspicious'],
+                                          budget=point_budget, labels=labels)
+                else:
+                    pts = decimate(df, age_col, 'voltage_fluctuation', point_budget, keep=df['is_suspicious'])
+                    fig2 = px.scatter(pts, x=age_col, y='voltage_fluctuation',
+                                      color='is_suspicious',
+                                      color_discrete_map={True:'#E8304A', False:'#00C87A'},
+                                      hover_data=['feeder_id','state'], labels=labels)
+                    note = sample_note(len(pts), len(df), int(df['is_suspicious'].sum()))
+                return plotly_dark_layout(fig2, 300), note
+            fig2, note = figure('voltage_scatter', voltage_scatter_fig, chart_mode, point_budget)
+            if note: st.caption(note)
             st.plotly_chart(fig2, use_container_width=True)
 
     section_divider("Suspicious Feeder List")
@@ -230,32 +270,32 @@ elif page == "Anomaly":
     extra = [c for c in ['transformer_age_years','transformer_age',
                           'smart_meter_installed','smart_meter',
                           'voltage_fluctuation','risk_label'] if c in df.columns]
-    susp_df = df[df['is_suspicious']][base+extra].sort_values('loss_percentage', ascending=False)
-    st.dataframe(susp_df.head(20), use_container_width=True, hide_index=True)
-    st.download_button("📥 Download Suspicious Feeders Report",
-                       susp_df.to_csv(index=False), "suspicious_feeders.csv",
-                       use_container_width=True)
+    paged_table(df, lambda f: f['is_suspicious'].to_numpy(), base+extra,
+                ('suspicious', data.version), sort_by='loss_percentage',
+                download=("📥 Download Suspicious Feeders Report", "suspicious_feeders.csv"))
 
 
 # ════════════════════════════════════════════════════════════════
 # PAGE: Asset Risk
 # ════════════════════════════════════════════════════════════════
 elif page == "Risk":
+    import plotly.express as px
     topbar("Asset Risk", "GridSense AI  /  Predictive Maintenance")
+    risk = d['risk']
     info_banner("🔧 <strong>Random Forest</strong> predicts transformer & line failure risk based on age, load factor, temperature, and historical outage patterns.", "purple")
 
     age_col = col_name(['transformer_age_years','transformer_age'], df)
-    avg_age = f"{df[age_col].mean():.0f} yr" if age_col else "N/A"
+    avg_age = f"{d['avg_transformer_age']:.0f} yr" if age_col else "N/A"
 
     kpi_row([
         {"label":"High Risk",
-         "value":str(int((df['risk_label']=='HIGH').sum())),
+         "value":str(risk['HIGH']),
          "delta":"Replace soon","color":"red","icon":"🔴"},
         {"label":"Medium Risk",
-         "value":str(int((df['risk_label']=='MEDIUM').sum())),
+         "value":str(risk['MEDIUM']),
          "delta":"Monitor","color":"orange","icon":"🟠"},
         {"label":"Low Risk",
-         "value":str(int((df['risk_label']=='LOW').sum())),
+         "value":str(risk['LOW']),
          "delta":"Healthy","color":"green","icon":"🟢"},
         {"label":"Avg Transformer Age",
          "value":avg_age,"delta":"Years in service","color":"cyan","icon":"🕐"},
@@ -266,72 +306,101 @@ elif page == "Risk":
 
     with col1:
         chart_title("Asset Risk Distribution")
-        rc = df['risk_label'].value_counts().reset_index()
-        rc.columns = ['Risk Level','Count']
-        fig = px.pie(rc, values='Count', names='Risk Level', color='Risk Level',
-                     color_discrete_map={'HIGH':'#E8304A','MEDIUM':'#FF8C42','LOW':'#00C87A'},
-                     hole=0.55)
-        fig.update_traces(textfont_color='#E8F0F8')
-        plotly_dark_layout(fig, 280)
-        st.plotly_chart(fig, use_container_width=True)
+        def risk_pie_fig():
+            rc = pd.DataFrame({'Risk Level': list(risk), 'Count': list(risk.values())})
+            fig = px.pie(rc, values='Count', names='Risk Level', color='Risk Level',
+                         color_discrete_map={'HIGH':'#E8304A','MEDIUM':'#FF8C42','LOW':'#00C87A'},
+                         hole=0.55)
+            fig.update_traces(textfont_color='#E8F0F8')
+            return plotly_dark_layout(fig, 280)
+        st.plotly_chart(figure('risk_pie', risk_pie_fig), use_container_width=True)
 
     with col2:
         if age_col and 'failure_risk_score' in df.columns:
             chart_title("Transformer Age vs Failure Risk")
-            fig2 = px.scatter(df, x=age_col, y='failure_risk_score',
-                              color='risk_label',
-                              color_discrete_map={
-                                  'HIGH':'#E8304A','MEDIUM':'#FF8C42','LOW':'#00C87A'},
-                              hover_data=['feeder_id','state'],
-                              labels={age_col:"Age (yrs)","failure_risk_score":"Risk Score"})
-            plotly_dark_layout(fig2, 280)
+            labels = {age_col:"Age (yrs)","failure_risk_score":"Risk Score"}
+            def risk_scatter_fig():
+                note = ""
+                high = (df['risk_label'] == 'HIGH').to_numpy()
+                if chart_mode == "Density":
+                    fig2 = density_figure(df, age_col, 'failure_risk_score', high,
+                                          budget=point_budget, labels=labels)
+                else:
+                    pts = decimate(df, age_col, 'failure_risk_score', point_budget, keep=high)
+                    fig2 = px.scatter(pts, x=age_col, y='failure_risk_score',
+                                      color='risk_label',
+                                      color_discrete_map={
+                                          'HIGH':'#E8304A','MEDIUM':'#FF8C42','LOW':'#00C87A'},
+                                      hover_data=['feeder_id','state'], labels=labels)
+                    note = sample_note(len(pts), len(df), int(high.sum()))
+                return plotly_dark_layout(fig2, 280), note
+            fig2, note = figure('risk_scatter', risk_scatter_fig, chart_mode, point_budget)
+            if note: st.caption(note)
             st.plotly_chart(fig2, use_container_width=True)
 
     section_divider("High Risk Assets — Replace / Maintain Immediately")
     risk_cols = [c for c in ['feeder_id','state','transformer_age_years','transformer_age',
                               'failure_risk_score','loss_percentage',
                               'outage_hours_monthly','outage_hours'] if c in df.columns]
-    hr = df[df['risk_label']=='HIGH'][risk_cols].sort_values('failure_risk_score', ascending=False)
-    st.dataframe(hr.head(20), use_container_width=True, hide_index=True)
+    paged_table(df, lambda f: (f['risk_label'] == 'HIGH').to_numpy(), risk_cols,
+                ('high_risk', data.version), sort_by='failure_risk_score')
 
 
 # ════════════════════════════════════════════════════════════════
 # PAGE: AI Recommendations
 # ════════════════════════════════════════════════════════════════
 elif page == "AI":
+    from gemini_engine import (stream_feeder_recommendation, stream_state_strategy,
+                               run_batch_recommendations)
+    from database import GridDatabase
     topbar("AI Recommendations", "GridSense AI  /  Gemini AI Analysis")
     tab1, tab2 = st.tabs(["🔍  Feeder Analysis", "📋  State Strategy"])
 
     with tab1:
         st.markdown("#### Select a feeder for deep AI analysis")
-        options = df[df['is_suspicious']]['feeder_id'].unique()[:30]
+        options = d['suspicious_feeders']
         selected = st.selectbox("Choose suspicious feeder:", options)
         if st.button("🔍 Analyse with Gemini AI", type="primary"):
             row = df[df['feeder_id']==selected].iloc[0].to_dict()
-            with st.spinner("Gemini is analysing..."):
-                result = get_feeder_recommendation(row)
+            st.write_stream(stream_feeder_recommendation(row))
             st.success("✅ Analysis Complete!")
-            st.markdown(result)
+
+        st.markdown("---")
+        st.markdown("#### Morning report — every flagged feeder")
+        if st.button("📑 Generate Batch Report"):
+            rows = (df.loc[df['is_suspicious']]
+                      .drop_duplicates('feeder_id')
+                      .to_dict('records'))
+            progress = st.progress(0.0, text=f"0 / {len(rows)} feeders")
+            done = []
+            def on_result(r):
+                done.append(r)
+                progress.progress(len(done) / len(rows), text=f"{len(done)} / {len(rows)} feeders")
+            results = run_batch_recommendations(rows, db=GridDatabase("gridsense.db"),
+                                                on_result=on_result)
+            failed = sum(r['status'] != 'ok' for r in results)
+            st.success(f"✅ {len(results) - failed} recommendations ready"
+                       + (f" · {failed} failed" if failed else ""))
+            report = "\n\n---\n\n".join(f"## {r['feeder_id']}\n\n{r['text']}" for r in results)
+            st.download_button("📥 Download Batch Report", report,
+                               "feeder_recommendations.md", use_container_width=True)
 
     with tab2:
         st.markdown("#### Generate state-level 2030 strategy")
-        states = df['state'].unique().tolist()
+        states = sorted(d['state_loss'].index)
         sel_state = st.selectbox("Choose State:", states)
         if st.button("📋 Generate State Strategy"):
-            sdf = df[df['state']==sel_state]
-            with st.spinner(f"Building strategy for {sel_state}..."):
-                strategy = get_state_strategy(
-                    sel_state, sdf['loss_percentage'].mean(),
-                    int(sdf['is_suspicious'].sum()),
-                    int((sdf['risk_label']=='HIGH').sum()))
+            ss = agg.state_summary(cube, sel_state)
+            st.write_stream(stream_state_strategy(
+                sel_state, ss['avg_loss'], ss['suspicious_count'], ss['high_risk_count']))
             st.success("✅ Strategy Ready!")
-            st.markdown(strategy)
 
 
 # ════════════════════════════════════════════════════════════════
 # PAGE: GIIP Framework
 # ════════════════════════════════════════════════════════════════
 elif page == "GIIP":
+    from giip_page import show_giip_page
     show_giip_page()
 
 
@@ -339,7 +408,9 @@ elif page == "GIIP":
 # PAGE: Chat
 # ════════════════════════════════════════════════════════════════
 elif page == "Chat":
+    from gemini_engine import stream_gridsense
     topbar("Ask GridSense AI", "GridSense AI  /  AI Assistant")
+    ctx = {**d['context'], 'last_updated': datetime.now().strftime("%H:%M:%S")}
 
     starters = [
         "Which state should we prioritize first?",
@@ -366,9 +437,7 @@ elif page == "Chat":
         with st.chat_message("user"):
             st.markdown(user_input)
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = ask_gridsense(user_input, ctx)
-            st.markdown(response)
+            response = st.write_stream(stream_gridsense(user_input, ctx))
             st.session_state.chat_history.append({"role":"assistant","content":response})
 
     if st.button("🗑️ Clear Chat"):
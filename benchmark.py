@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from data_generator import iter_grid_chunks
+import aggregates as agg
+from features import add_feeder_features
+import ml_models
+from ml_models import risk_labels, train, score
+from giip_page import generate_detections, generate_actions
+
+SIZES = [3_000, 300_000, 30_000_000]
+RESULTS_DIR = 'bench_results'
+REGRESSION_THRESHOLD = 1.2   # flag stages >20% slower than the baseline
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+_STATM = '/proc/self/statm'
+_PAGE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _rss():
+    with open(_STATM) as f:
+        return int(f.read().split()[1]) * _PAGE
+
+
+class _PeakRSS(threading.Thread):
+    # Samples resident memory in the background; unlike tracemalloc it
+    # doesn't slow down allocation-heavy Python code (e.g. to_csv).
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.start_rss = self.peak = _rss()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, _rss())
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, _rss())
+        return self.peak - self.start_rss
+
+
+def _measure(fn, *args):
+    # Wall time plus peak memory above the starting point. Falls back to
+    # tracemalloc where /proc isn't available.
+    if os.path.exists(_STATM):
+        sampler = _PeakRSS()
+        sampler.start()
+        t0 = time.perf_counter()
+        out = fn(*args)
+        secs = time.perf_counter() - t0
+        return out, secs, sampler.stop()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(*args)
+    secs = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, secs, peak
+
+
+def synthetic_fleet(n_rows, days=365, seed=0):
+    n_feeders = max(1, n_rows // days)
+    df = pd.concat(iter_grid_chunks(n_feeders, days, seed), ignore_index=True)
+    rng = np.random.default_rng(seed)
+    df['failure_risk_score'] = rng.random(len(df))
+    df['is_suspicious'] = rng.random(len(df)) < 0.12
+    df['risk_label'] = risk_labels(df['failure_risk_score'].to_numpy())
+    return df
+
+
+# ── Row-wise vs vectorized ────────────────────────────────────────
+# Each pair is the code as it was before user-009 and the code that replaced it.
+def _labels_apply(df):
+    # run_risk_model labelling before: one Python lambda call per row
+    return df['failure_risk_score'].apply(
+        lambda x: 'HIGH' if x > 0.7 else ('MEDIUM' if x > 0.4 else 'LOW'))
+
+
+def _labels_vectorized(df):
+    return risk_labels(df['failure_risk_score'].to_numpy())
+
+
+def _detections_iterrows(df):
+    # generate_detections before: boolean-filter the whole frame, then iterrows
+    detections = []
+    for _, row in df[df['is_suspicious']].head(3).iterrows():
+        detections.append({"type": "THEFT", "severity": "CRITICAL" if row['loss_percentage'] > 28 else "HIGH",
+                           "feeder": row['feeder_id'], "state": row.get('state', 'N/A'),
+                           "detail": f"Loss {row['loss_percentage']:.1f}% — anomalous consumption pattern",
+                           "icon": "🚨"})
+    for _, row in df[df['risk_label'] == 'HIGH'].head(2).iterrows():
+        detections.append({"type": "HARDWARE", "severity": "HIGH", "feeder": row['feeder_id'],
+                           "state": row.get('state', 'N/A'),
+                           "detail": f"Transformer age {int(row.get('transformer_age', 0))}yr — predicted failure in 3-6 wks",
+                           "icon": "⚠️"})
+    return detections
+
+
+def bench_vectorized(n_rows=5_000_000):
+    df = synthetic_fleet(n_rows)
+    # the old pipeline produced object-dtype labels, so the old path gets them
+    legacy = df.assign(risk_label=np.asarray(df['risk_label'], dtype=object))
+    results = {}
+    for name, slow, fast in [
+        ('risk_labels', lambda: _labels_apply(df), lambda: _labels_vectorized(df)),
+        ('detections', lambda: _detections_iterrows(legacy), lambda: generate_detections(df)),
+    ]:
+        t_slow, t_fast = _timed(slow), _timed(fast)
+        results[name] = (t_slow, t_fast)
+        print(f"{name:<16} before {t_slow:8.3f}s   after {t_fast:8.3f}s"
+              f"   {t_slow / max(t_fast, 1e-9):7.1f}x")
+    return results
+
+
+# ── Import cost ───────────────────────────────────────────────────
+# What app.py imports before first paint, and what it defers to the pages
+# that need it. Each set is timed in a fresh interpreter with -X importtime.
+STARTUP_IMPORTS = ['streamlit', 'pandas', 'numpy', 'theme', 'data_service', 'aggregates', 'charts']
+DEFERRED_IMPORTS = ['plotly.express', 'sklearn.ensemble', 'google.generativeai', 'giip_page', 'gemini_engine']
+
+
+def import_profile(modules):
+    """[(cumulative_s, self_s, name, depth)] for every module imported."""
+    code = "; ".join(f"import {m}" for m in modules) or "pass"
+    proc = subprocess.run([sys.executable, '-W', 'ignore', '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cum_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(cum_us) / 1e6, int(self_us) / 1e6, name.strip(), depth))
+    return rows
+
+
+def _top_level(rows, skip=frozenset()):
+    return [r for r in rows if r[3] == 0 and r[2] not in skip]
+
+
+def bench_imports(top=10):
+    # Modules the bare interpreter loads anyway (site, encodings, ...) are left out
+    interpreter = {r[2] for r in import_profile([])}
+    startup = _top_level(import_profile(STARTUP_IMPORTS), interpreter)
+    total = sum(r[0] for r in startup)
+    print(f"app startup imports  {total:7.3f}s")
+    for cum, _, name, _ in sorted(startup, reverse=True)[:top]:
+        print(f"  {name:<28} {cum:7.3f}s")
+    deferred = {}
+    for m in DEFERRED_IMPORTS:
+        deferred[m] = sum(r[0] for r in _top_level(import_profile([m]), interpreter))
+        print(f"deferred {m:<22} {deferred[m]:7.3f}s")
+    return {'startup': round(total, 4), 'deferred': {k: round(v, 4) for k, v in deferred.items()}}
+
+
+# ── Page reruns ───────────────────────────────────────────────────
+def bench_pages(runs=5):
+    """First-visit and median rerun latency of each app page, via AppTest."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'),
+                           default_timeout=600)
+    at.run()
+    results = {}
+    for label in at.sidebar.radio[0].options:
+        first = _timed(lambda: at.sidebar.radio[0].set_value(label).run())
+        rerun = float(np.median([_timed(at.run) for _ in range(runs)]))
+        if at.exception:
+            raise RuntimeError(f"{label}: {at.exception[0].message}")
+        results[label] = {'first_visit': round(first, 4), 'rerun': round(rerun, 4)}
+        print(f"{label:<24} first {first:7.3f}s   rerun {rerun:7.3f}s")
+    return results
+
+
+# ── Pipeline stages ───────────────────────────────────────────────
+def _generate(n_rows):
+    n_feeders = max(1, n_rows // 30)
+    return pd.concat(iter_grid_chunks(n_feeders, 30, seed=0), ignore_index=True)
+
+
+def _write_csv(df, path):
+    df.to_csv(path, index=False)
+
+
+def _context(df):
+    # Same path as app.py: build the aggregate cube, then read ctx from it
+    return agg.context(agg.build_aggregates(df))
+
+
+def _giip(df):
+    return generate_actions(generate_detections(df))
+
+
+@contextmanager
+def scratch_model_registry():
+    # train() registers what it fits; point the registry at a temp dir so
+    # benchmark models never replace the ones the app and ingest score with.
+    saved = ml_models.MODEL_DIR, ml_models.LATEST_PATH, ml_models._loaded, ml_models._latest
+    with tempfile.TemporaryDirectory() as tmp:
+        ml_models.MODEL_DIR = tmp
+        ml_models.LATEST_PATH = os.path.join(tmp, 'latest.json')
+        ml_models._loaded, ml_models._latest = {}, (None, None)
+        try:
+            yield tmp
+        finally:
+            (ml_models.MODEL_DIR, ml_models.LATEST_PATH,
+             ml_models._loaded, ml_models._latest) = saved
+
+
+def run_pipeline(n_rows, stages=None):
+    """Run every stage once at n_rows; returns {stage: {seconds, peak_mb}}."""
+    with scratch_model_registry():
+        return _run_pipeline(n_rows, stages)
+
+
+def _run_pipeline(n_rows, stages):
+    results = {}
+
+    def stage(name, fn, *args):
+        if stages and name not in stages:
+            return None
+        out, secs, peak = _measure(fn, *args)
+        results[name] = {'seconds': round(secs, 4), 'peak_mb': round(peak / 2**20, 1)}
+        print(f"  {name:<14} {secs:9.3f}s  {peak / 2**20:9.1f} MB")
+        return out
+
+    print(f"── {n_rows:,} rows")
+    df = stage('generate', _generate, n_rows)
+    if df is None:
+        df = _generate(n_rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'grid_data.csv')
+        stage('write_csv', _write_csv, df, csv_path)
+        if os.path.exists(csv_path):
+            stage('read_csv', pd.read_csv, csv_path)
+        try:
+            from storage import write_grid_dataset, read_grid_dataset
+            pq_dir = os.path.join(tmp, 'grid_data')
+            stage('write_parquet', write_grid_dataset, df, pq_dir)
+            if os.path.isdir(pq_dir):
+                stage('read_parquet', read_grid_dataset, pq_dir)
+        except ImportError:
+            pass
+
+    stage('features', add_feeder_features, df)
+    models = stage('train', train, df)
+    if models is None:
+        models = train(df)          # later stages need a scored frame
+    stage('score', score, df, models)
+    if 'is_suspicious' not in df.columns:
+        score(df, models)
+    stage('context', _context, df)
+    stage('giip_helpers', _giip, df)
+    return results
+
+
+def save_results(results, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    payload = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count()},
+        'results': results,
+    }
+    path = os.path.join(results_dir, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Print stages slower than the baseline by more than threshold; returns them."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    for size, stages in results.items():
+        for name, cur in stages.items():
+            old = baseline.get(size, {}).get(name)
+            if old and cur['seconds'] > old['seconds'] * threshold:
+                regressions.append((size, name, old['seconds'], cur['seconds']))
+                print(f"⚠️  {name} @ {int(size):,} rows: "
+                      f"{old['seconds']:.3f}s → {cur['seconds']:.3f}s")
+    if not regressions:
+        print("✅ No regressions against baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="GridSense pipeline benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--stages', nargs='+', default=None)
+    parser.add_argument('--baseline', help="results JSON to compare against")
+    parser.add_argument('--vectorized', type=int, metavar='ROWS',
+                        help="only time the user-009 paths before and after vectorizing")
+    parser.add_argument('--imports', action='store_true',
+                        help="only report app startup vs deferred import cost")
+    parser.add_argument('--pages', action='store_true',
+                        help="only report per-page rerun latency of the app")
+    args = parser.parse_args()
+
+    if args.vectorized:
+        bench_vectorized(args.vectorized)
+        sys.exit(0)
+    if args.imports:
+        bench_imports()
+        sys.exit(0)
+    if args.pages:
+        bench_pages()
+        sys.exit(0)
+
+    results = {str(n): run_pipeline(n, args.stages) for n in args.sizes}
+    print(f"📄 Saved {save_results(results)}")
+    if args.baseline and compare(results, args.baseline):
+        sys.exit(1)
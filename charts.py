@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+POINT_BUDGET = 5_000
+BUDGET_OPTIONS = [1_000, 2_000, 5_000, 20_000, 50_000]
+DENSITY_BINS = 60
+FIGURE_CACHE_SIZE = 64
+
+
+def decimate(df, x, y, budget=POINT_BUDGET, keep=None, seed=0):
+    """Cut df down to at most `budget` rows for plotting.
+
+    Rows in `keep` (e.g. suspicious / HIGH) are always retained while they
+    fit the budget. The rest is thinned to one point per cell of an x/y grid,
+    so sparse regions and outliers survive, then topped up at random.
+    """
+    n = len(df)
+    if n <= budget:
+        return df
+    rng = np.random.default_rng(seed)
+    keep_mask = np.zeros(n, bool) if keep is None else np.asarray(keep, bool)
+    kept = np.flatnonzero(keep_mask)
+    if len(kept) >= budget:
+        return df.iloc[np.sort(rng.choice(kept, budget, replace=False))]
+
+    rest = np.flatnonzero(~keep_mask)
+    room = budget - len(kept)
+    side = max(int(np.sqrt(room)), 1)
+    cells = np.zeros(len(rest), dtype=np.int64)
+    for col in (x, y):
+        v = df[col].to_numpy(dtype=float)[rest]
+        lo, span = np.nanmin(v), np.ptp(v[~np.isnan(v)]) or 1.0
+        cells = cells * side + np.clip(((v - lo) / span * (side - 1)).astype(int), 0, side - 1)
+    _, first = np.unique(cells, return_index=True)
+    picked = rest[first]
+
+    if len(picked) < room:
+        spare = np.setdiff1d(rest, picked, assume_unique=True)
+        picked = np.concatenate([picked, rng.choice(spare, room - len(picked), replace=False)])
+    return df.iloc[np.sort(np.concatenate([kept, picked]))]
+
+
+def density_figure(df, x, y, flagged=None, flagged_color='#E8304A',
+                   budget=POINT_BUDGET, nbins=DENSITY_BINS, labels=None):
+    """Server-side 2-D histogram of every row, with flagged rows overlaid as
+    points — payload is nbins² cells plus at most `budget` markers."""
+    import plotly.graph_objects as go
+    labels = labels or {}
+    xv = df[x].to_numpy(dtype=float)
+    yv = df[y].to_numpy(dtype=float)
+    counts, xe, ye = np.histogram2d(xv, yv, bins=nbins)
+    fig = go.Figure(go.Heatmap(
+        x=(xe[:-1] + xe[1:]) / 2, y=(ye[:-1] + ye[1:]) / 2,
+        z=np.where(counts.T > 0, counts.T, np.nan),
+        colorscale=[[0, 'rgba(0,200,122,0.15)'], [1, 'rgba(0,200,122,1)']],
+        showscale=False, hovertemplate='count %{z}<extra></extra>'))
+    if flagged is not None:
+        pts = df[np.asarray(flagged, bool)]
+        if len(pts) > budget:
+            pts = pts.sample(budget, random_state=0)
+        fig.add_trace(go.Scattergl(
+            x=pts[x], y=pts[y], mode='markers', name='Flagged',
+            marker=dict(color=flagged_color, size=5)))
+    fig.update_layout(xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y))
+    return fig
+
+
+def sample_note(shown, total, flagged=None):
+    # decimate keeps every flagged row only while they fit in what's shown
+    if shown >= total:
+        return ""
+    note = f"Showing {shown:,} of {total:,} points"
+    if flagged is not None and flagged <= shown:
+        note += " (all flagged points kept)"
+    return note
+
+
+# ── Figure cache ──────────────────────────────────────────────────
+# Built figures shared by every session, keyed by (chart id, data version,
+# theme, ...). Entries are never mutated after build: st.plotly_chart only
+# reads them, so a hit costs one serialisation instead of a px rebuild.
+_figures = OrderedDict()
+_figures_lock = threading.Lock()
+
+
+def cached_figure(key, build, maxsize=FIGURE_CACHE_SIZE):
+    """Return build() for key, building it at most once while it stays cached.
+    build may return a figure or a tuple of figure and extras."""
+    with _figures_lock:
+        if key in _figures:
+            _figures.move_to_end(key)
+            return _figures[key]
+    value = build()
+    with _figures_lock:
+        _figures[key] = value
+        while len(_figures) > maxsize:
+            _figures.popitem(last=False)
+    return value
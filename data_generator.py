@@ -1,39 +1,84 @@
+import argparse
 import pandas as pd
 import numpy as np
-import random
-
-def generate_grid_data(n_feeders=100, days=30):
-    data = []
-    states = ['Maharashtra', 'Uttar Pradesh', 'Rajasthan', 
-              'Gujarat', 'Bihar', 'Tamil Nadu', 'West Bengal', 
-              'Madhya Pradesh']
-    
-    for i in range(n_feeders):
-        for day in range(days):
-            units_injected = random.uniform(500, 5000)
-            loss_pct = random.uniform(5, 35)
-            units_billed = units_injected * (1 - loss_pct / 100)
-
-            record = {
-                'feeder_id': f'FEEDER_{i:03d}',
-                'state': random.choice(states),
-                'date': pd.Timestamp('2024-01-01') + pd.Timedelta(days=day),
-                'units_injected_kwh': round(units_injected, 2),
-                'units_billed_kwh': round(units_billed, 2),
-                'loss_percentage': round(loss_pct, 2),
-                'transformer_age_years': random.randint(1, 30),
-                'temperature_celsius': round(random.uniform(15, 45), 1),
-                'load_factor': round(random.uniform(0.4, 0.95), 2),
-                'smart_meter_installed': random.choice([True, False]),
-                'voltage_fluctuation': round(random.uniform(0.5, 10.0), 2),
-                'outage_hours_monthly': round(random.uniform(0, 20), 1),
-            }
-            data.append(record)
-
-    df = pd.DataFrame(data)
-    df.to_csv('grid_data.csv', index=False)
+
+STATES = ['Maharashtra', 'Uttar Pradesh', 'Rajasthan',
+          'Gujarat', 'Bihar', 'Tamil Nadu', 'West Bengal',
+          'Madhya Pradesh']
+START_DATE = pd.Timestamp('2024-01-01')
+CHUNK_ROWS = 1_000_000
+
+
+def iter_grid_chunks(n_feeders=100, days=30, seed=None, chunk_rows=CHUNK_ROWS):
+    # Whole columns per chunk of feeders — rows stay feeder-major like the
+    # original nested loop, but no Python work happens per row.
+    rng = np.random.default_rng(seed)
+    feeder_dtype = pd.CategoricalDtype([f'FEEDER_{i:03d}' for i in range(n_feeders)])
+    state_dtype = pd.CategoricalDtype(STATES)
+    dates = pd.date_range(START_DATE, periods=days, freq='D').values
+    step = max(1, chunk_rows // max(days, 1))
+
+    for lo in range(0, n_feeders, step):
+        hi = min(lo + step, n_feeders)
+        n = (hi - lo) * days
+        units_injected = rng.uniform(500, 5000, n)
+        loss_pct = rng.uniform(5, 35, n)
+        units_billed = units_injected * (1 - loss_pct / 100)
+
+        yield pd.DataFrame({
+            'feeder_id': pd.Categorical.from_codes(
+                np.repeat(np.arange(lo, hi), days), dtype=feeder_dtype),
+            'state': pd.Categorical.from_codes(
+                rng.integers(0, len(STATES), n), dtype=state_dtype),
+            'date': np.tile(dates, hi - lo),
+            'units_injected_kwh': units_injected.round(2),
+            'units_billed_kwh': units_billed.round(2),
+            'loss_percentage': loss_pct.round(2),
+            'transformer_age_years': rng.integers(1, 31, n),
+            'temperature_celsius': rng.uniform(15, 45, n).round(1),
+            'load_factor': rng.uniform(0.4, 0.95, n).round(2),
+            'smart_meter_installed': rng.random(n) < 0.5,
+            'voltage_fluctuation': rng.uniform(0.5, 10.0, n).round(2),
+            'outage_hours_monthly': rng.uniform(0, 20, n).round(1),
+        })
+
+
+def write_grid_data(path='grid_data.csv', n_feeders=100, days=30, seed=None,
+                    chunk_rows=CHUNK_ROWS):
+    # Streams chunks straight to disk so memory stays bounded by chunk_rows.
+    total = 0
+    for i, chunk in enumerate(iter_grid_chunks(n_feeders, days, seed, chunk_rows)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        total += len(chunk)
+    return total
+
+
+def generate_grid_data(n_feeders=100, days=30, seed=None, path='grid_data.csv',
+                       chunk_rows=CHUNK_ROWS):
+    df = pd.concat(list(iter_grid_chunks(n_feeders, days, seed, chunk_rows)),
+                   ignore_index=True)
+    if path:
+        df.to_csv(path, index=False)
     print(f"✅ Generated {len(df)} records")
     return df
 
+
 if __name__ == "__main__":
-    generate_grid_data()
+    parser = argparse.ArgumentParser(description="Generate synthetic feeder readings")
+    parser.add_argument('--feeders', type=int, default=100)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--out', default=None,
+                        help="output path (default: grid_data.csv, or the "
+                             "storage.DATASET_DIR directory with --parquet)")
+    parser.add_argument('--parquet', action='store_true',
+                        help="write a state/month partitioned Parquet dataset to --out")
+    args = parser.parse_args()
+    if args.parquet:
+        from storage import DATASET_DIR, write_grid_dataset
+        args.out = args.out or DATASET_DIR
+        n = write_grid_dataset(iter_grid_chunks(args.feeders, args.days, args.seed), args.out)
+    else:
+        args.out = args.out or 'grid_data.csv'
+        n = write_grid_data(args.out, args.feeders, args.days, args.seed)
+    print(f"✅ Generated {n} records → {args.out}")
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+import pandas as pd
+
+import aggregates as agg
+from data_generator import generate_grid_data
+from storage import (DATASET_DIR, dataset_exists, read_grid_dataset, compact,
+                     save_snapshot, load_snapshot, snapshot_is_fresh)
+
+SOURCES = ['grid_data.csv', DATASET_DIR]
+REFRESH_INTERVAL_SECONDS = 15 * 60
+
+# ── Derived views ─────────────────────────────────────────────────
+# Everything a page reads beyond the raw df/cube, by name. Pages declare
+# the names they need (app.PAGES) and each one is computed at most once per
+# data version, shared by every session.
+DERIVED = {
+    'context':             lambda s: agg.context(s.aggs),
+    'risk':                lambda s: agg.risk_counts(s.aggs['cube']),
+    'state_loss':          lambda s: agg.state_loss(s.aggs['cube']).sort_values(ascending=False),
+    'daily_loss':          lambda s: agg.daily_loss(s.aggs['cube']),
+    'smart_meters':        lambda s: agg.smart_meter_counts(s.aggs['cube']),
+    'avg_transformer_age': lambda s: agg.avg_transformer_age(s.aggs['cube']),
+    'suspicious_feeders':  lambda s: s.df.loc[s.df['is_suspicious'], 'feeder_id'].unique()[:30],
+}
+
+
+class DataState(namedtuple('DataState', 'version df aggs built_at source memo')):
+    __slots__ = ()
+
+    def derive(self, name):
+        # Racing sessions may both compute a value; both results are identical
+        if name not in self.memo:
+            self.memo[name] = DERIVED[name](self)
+        return self.memo[name]
+
+    def inputs(self, names):
+        return {name: self.derive(name) for name in names}
+
+
+def _source_name():
+    if dataset_exists(DATASET_DIR):
+        return "Parquet"
+    return "CSV"
+
+
+def build_snapshot():
+    """Read the raw source, score it and write the processed snapshot."""
+    from ml_models import prepare_data   # sklearn is only needed to rebuild
+    if dataset_exists(DATASET_DIR):
+        df = read_grid_dataset(DATASET_DIR)
+    else:
+        try:    df = pd.read_csv('grid_data.csv')
+        except: df = generate_grid_data()
+    save_snapshot(prepare_data(compact(df)))
+
+
+def load_state(version):
+    df = load_snapshot()
+    return DataState(version, df, agg.build_aggregates(df),
+                     datetime.now(), _source_name(), {})
+
+
+class DataRefresher:
+    """Holds the current DataState and rebuilds it off the request path.
+
+    Readers call current() and always get a complete, consistent state;
+    a rebuild publishes its result with a single reference assignment, so
+    stale-but-valid data is served until the new one is ready.
+    """
+
+    def __init__(self, interval=REFRESH_INTERVAL_SECONDS):
+        self.interval = interval
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._building = False
+        if not snapshot_is_fresh(SOURCES):
+            build_snapshot()
+        self._state = load_state(version=1)
+        threading.Thread(target=self._schedule, name="data-refresher", daemon=True).start()
+
+    def current(self):
+        return self._state
+
+    @property
+    def building(self):
+        return self._building
+
+    def refresh(self, force=True):
+        """Start a background rebuild; returns False if one is already running."""
+        with self._lock:
+            if self._building:
+                return False
+            self._building = True
+        threading.Thread(target=self._rebuild, args=(force,),
+                         name="data-rebuild", daemon=True).start()
+        return True
+
+    def _rebuild(self, force):
+        try:
+            if force or not snapshot_is_fresh(SOURCES):
+                build_snapshot()
+                self._state = load_state(self._state.version + 1)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+        finally:
+            self._building = False
+
+    def _schedule(self):
+        # Periodic check: only rebuilds when the source data changed on disk
+        while True:
+            time.sleep(self.interval)
+            self.refresh(force=False)
@@ -0,0 +1,283 @@
+import sqlite3
+import threading
+from datetime import datetime
+import pandas as pd
+
+# Reading columns follow giip_page.sim_sensor_reading; outage_hours is extra so
+# ml_models.prepare_data has every feature it needs.
+READING_COLS = [
+    "feeder_id", "state", "timestamp", "loss_percentage", "voltage",
+    "current_amp", "power_kw", "units_injected", "units_billed", "temperature",
+    "load_factor", "voltage_fluctuation", "transformer_age", "smart_meter",
+    "outage_hours",
+]
+ALERT_COLS = ["feeder_id", "state", "type", "severity", "detail", "created_at"]
+
+# Sensor names → the names ml_models expects
+MODEL_ALIASES = {
+    "units_injected":  "units_injected_kwh",
+    "units_billed":    "units_billed_kwh",
+    "temperature":     "temperature_celsius",
+    "transformer_age": "transformer_age_years",
+    "smart_meter":     "smart_meter_installed",
+    "outage_hours":    "outage_hours_monthly",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    id                  INTEGER PRIMARY KEY,
+    feeder_id           TEXT NOT NULL,
+    state               TEXT,
+    timestamp           TEXT NOT NULL,
+    loss_percentage     REAL,
+    voltage             REAL,
+    current_amp         REAL,
+    power_kw            REAL,
+    units_injected      REAL,
+    units_billed        REAL,
+    temperature         REAL,
+    load_factor         REAL,
+    voltage_fluctuation REAL,
+    transformer_age     INTEGER,
+    smart_meter         INTEGER,
+    outage_hours        REAL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_readings_feeder_ts ON readings (feeder_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id         INTEGER PRIMARY KEY,
+    feeder_id  TEXT NOT NULL,
+    state      TEXT,
+    type       TEXT NOT NULL,
+    severity   TEXT NOT NULL,
+    detail     TEXT,
+    created_at TEXT NOT NULL,
+    resolved   INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_open ON alerts (resolved, created_at);
+
+CREATE TABLE IF NOT EXISTS recommendations (
+    id         INTEGER PRIMARY KEY,
+    feeder_id  TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    text       TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_recommendations_feeder ON recommendations (feeder_id, created_at);
+
+-- One row per feeder, kept current by the trigger below so "latest per
+-- feeder" reads are O(feeders) no matter how much history is stored.
+CREATE TABLE IF NOT EXISTS latest_readings (
+    feeder_id           TEXT PRIMARY KEY,
+    id                  INTEGER NOT NULL,
+    state               TEXT,
+    timestamp           TEXT NOT NULL,
+    loss_percentage     REAL,
+    voltage             REAL,
+    current_amp         REAL,
+    power_kw            REAL,
+    units_injected      REAL,
+    units_billed        REAL,
+    temperature         REAL,
+    load_factor         REAL,
+    voltage_fluctuation REAL,
+    transformer_age     INTEGER,
+    smart_meter         INTEGER,
+    outage_hours        REAL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_latest_reading AFTER INSERT ON readings
+BEGIN
+    INSERT INTO latest_readings (id, {cols})
+    VALUES (NEW.id, {new_cols})
+    ON CONFLICT (feeder_id) DO UPDATE SET id = excluded.id, {updates}
+    WHERE excluded.timestamp >= latest_readings.timestamp;
+END;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+""".format(
+    cols=", ".join(READING_COLS),
+    new_cols=", ".join(f"NEW.{c}" for c in READING_COLS),
+    updates=", ".join(f"{c} = excluded.{c}" for c in READING_COLS if c != "feeder_id"),
+)
+
+INSERT_READING = (f"INSERT INTO readings ({', '.join(READING_COLS)}) "
+                  f"VALUES ({', '.join('?' * len(READING_COLS))})")
+INSERT_ALERT = (f"INSERT INTO alerts ({', '.join(ALERT_COLS)}) "
+                f"VALUES ({', '.join('?' * len(ALERT_COLS))})")
+
+LATEST_PER_FEEDER = (f"SELECT id, {', '.join(READING_COLS)} "
+                     f"FROM latest_readings ORDER BY feeder_id")
+
+# Last `?` readings of every feeder, oldest first. Driven by latest_readings
+# so each feeder is one index range scan on (feeder_id, timestamp).
+RECENT_PER_FEEDER = f"""
+SELECT r.id, {', '.join('r.' + c for c in READING_COLS)}
+FROM latest_readings l JOIN readings r ON r.id IN (
+    SELECT id FROM readings WHERE feeder_id = l.feeder_id
+    ORDER BY timestamp DESC, id DESC LIMIT ?)
+ORDER BY r.feeder_id, r.timestamp, r.id
+"""
+
+# Rebuilds latest_readings for databases created before the trigger existed
+BACKFILL_LATEST = f"""
+INSERT OR REPLACE INTO latest_readings (id, {', '.join(READING_COLS)})
+SELECT r.id, {', '.join('r.' + c for c in READING_COLS)} FROM readings r
+JOIN (SELECT feeder_id, MAX(timestamp) AS ts FROM readings GROUP BY feeder_id) m
+  ON r.feeder_id = m.feeder_id AND r.timestamp = m.ts
+"""
+
+BUMP_META = ("INSERT INTO meta (key, value) VALUES (?, ?) "
+             "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value")
+
+# path → (readings version, latest-per-feeder frame), shared by every
+# GridDatabase handle in the process; _recent_cache is the same keyed by
+# (path, window).
+_latest_cache = {}
+_recent_cache = {}
+
+
+def _timestamp(value):
+    # sim_sensor_reading only emits HH:MM:SS — anchor it to today so ordering
+    # still works across days.
+    if value is None:
+        return datetime.now().isoformat(timespec="seconds")
+    value = str(value)
+    if len(value) == 8 and value[2] == ":":
+        return f"{datetime.now().date().isoformat()}T{value}"
+    return value
+
+
+def _reading_row(r):
+    return (
+        r["feeder_id"], r.get("state"), _timestamp(r.get("timestamp")),
+        r.get("loss_percentage"), r.get("voltage"), r.get("current_amp"),
+        r.get("power_kw"), r.get("units_injected"), r.get("units_billed"),
+        r.get("temperature"), r.get("load_factor"), r.get("voltage_fluctuation"),
+        r.get("transformer_age"), int(bool(r.get("smart_meter"))),
+        r.get("outage_hours", 0.0),
+    )
+
+
+def _with_aliases(df):
+    df["smart_meter"] = df["smart_meter"].astype(bool)
+    for src, dst in MODEL_ALIASES.items():
+        df[dst] = df[src]
+    return df
+
+
+class GridDatabase:
+    def __init__(self, path="gridsense.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False,
+                                    cached_statements=64)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.executescript(SCHEMA)
+        self._init_meta()
+
+    def _init_meta(self):
+        with self._lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'total_readings'").fetchone():
+                return
+            total = self.conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+            if total:
+                self.conn.execute(BACKFILL_LATEST)
+            self.conn.executemany(BUMP_META, [("total_readings", total), ("version", 0)])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    # ── Writes ────────────────────────────────────────────────────
+    def insert_readings(self, readings):
+        rows = [_reading_row(r) for r in readings]
+        if not rows:
+            return 0
+        with self._lock, self.conn:
+            self.conn.executemany(INSERT_READING, rows)
+            self.conn.executemany(BUMP_META, [("total_readings", len(rows)), ("version", 1)])
+        return len(rows)
+
+    def insert_reading(self, reading):
+        return self.insert_readings([reading])
+
+    def add_alerts(self, alerts):
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [(a["feeder_id"], a.get("state"), a["type"], a["severity"],
+                 a.get("detail", ""), a.get("created_at", now)) for a in alerts]
+        with self._lock, self.conn:
+            self.conn.executemany(INSERT_ALERT, rows)
+        return len(rows)
+
+    def save_recommendations(self, results):
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [(r["feeder_id"], r["status"], r["text"], r.get("created_at", now))
+                for r in results]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO recommendations (feeder_id, status, text, created_at) "
+                "VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def resolve_alert(self, alert_id):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE alerts SET resolved = 1 WHERE id = ?", (alert_id,))
+
+    # ── Reads ─────────────────────────────────────────────────────
+    def _frame(self, sql, params=()):
+        cur = self.conn.execute(sql, params)
+        return pd.DataFrame(cur.fetchall(), columns=[c[0] for c in cur.description])
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def get_version(self):
+        return self._meta("version")
+
+    def get_latest_per_feeder(self):
+        # Served from the in-process snapshot until a write bumps the version;
+        # callers get a copy since prepare_data adds columns in place.
+        version = self.get_version()
+        cached = _latest_cache.get(self.path)
+        if cached is None or cached[0] != version:
+            df = _with_aliases(self._frame(LATEST_PER_FEEDER))
+            cached = _latest_cache[self.path] = (version, df)
+        return cached[1].copy()
+
+    def get_recent_per_feeder(self, window):
+        """Each feeder's last `window` readings, ordered by feeder then time —
+        the history features.latest_with_history needs for live scoring."""
+        version = self.get_version()
+        cached = _recent_cache.get((self.path, window))
+        if cached is None or cached[0] != version:
+            df = _with_aliases(self._frame(RECENT_PER_FEEDER, (window,)))
+            cached = _recent_cache[(self.path, window)] = (version, df)
+        return cached[1].copy()
+
+    def get_unresolved_alerts(self, limit=50):
+        cur = self.conn.execute(
+            "SELECT id, feeder_id, state, type, severity, detail, created_at "
+            "FROM alerts WHERE resolved = 0 ORDER BY created_at DESC LIMIT ?", (limit,))
+        cols = [c[0] for c in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    def get_recommendations(self, since=None):
+        if since is None:
+            return self._frame("SELECT * FROM recommendations ORDER BY created_at DESC")
+        return self._frame("SELECT * FROM recommendations WHERE created_at >= ? "
+                           "ORDER BY created_at DESC", (since,))
+
+    def get_total_readings(self):
+        return self._meta("total_readings")
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+WINDOW = 7
+HISTORY_FEATURES = [
+    'loss_roll_mean', 'loss_delta', 'loss_zscore',
+    'billing_ratio', 'billing_ratio_trend',
+]
+_RAW_COLS = ['feeder_id', 'loss_percentage', 'units_injected_kwh', 'units_billed_kwh']
+
+
+def _time_key(df):
+    for col in ('date', 'timestamp'):
+        if col in df.columns:
+            values = df[col]
+            if not pd.api.types.is_datetime64_any_dtype(values):
+                values = pd.to_datetime(values, format='ISO8601')
+            return values.to_numpy()
+    return np.arange(len(df))
+
+
+def _rolling_mean(x, starts, window):
+    # x is sorted by feeder; starts[i] is the first row of row i's feeder.
+    # Window sums come from one cumsum, so cost is O(n) with no group loop.
+    # NaNs are left out of both sums and counts so a missing reading can't
+    # poison every later window (and other feeders) through the cumsum.
+    idx = np.arange(len(x))
+    lo = np.maximum(idx + 1 - window, starts)
+    valid = ~np.isnan(x)
+    cs = np.concatenate(([0.0], np.cumsum(np.where(valid, x, 0.0))))
+    cn = np.concatenate(([0], np.cumsum(valid)))
+    count = cn[idx + 1] - cn[lo]
+    return np.divide(cs[idx + 1] - cs[lo], count,
+                     out=np.full(len(x), np.nan), where=count > 0)
+
+
+def _compute(df, window):
+    codes = pd.factorize(df['feeder_id'])[0]
+    order = np.lexsort((_time_key(df), codes))
+    codes = codes[order]
+    first = np.r_[True, codes[1:] != codes[:-1]]
+    starts = np.maximum.accumulate(np.where(first, np.arange(len(codes)), 0))
+
+    loss = df['loss_percentage'].to_numpy(dtype=float)[order]
+    injected = df['units_injected_kwh'].to_numpy(dtype=float)[order]
+    billed = df['units_billed_kwh'].to_numpy(dtype=float)[order]
+
+    mean = _rolling_mean(loss, starts, window)
+    var = np.maximum(_rolling_mean(loss * loss, starts, window) - mean * mean, 0)
+    std = np.sqrt(var)
+    delta = np.where(first, 0.0, loss - np.r_[loss[:1], loss[:-1]])
+    zscore = np.divide(loss - mean, std, out=np.zeros_like(loss), where=std > 1e-9)
+    ratio = np.divide(billed, injected, out=np.ones_like(billed), where=injected > 0)
+    ratio_trend = ratio - _rolling_mean(ratio, starts, window)
+
+    out = np.empty((len(order), len(HISTORY_FEATURES)), dtype=np.float32)
+    out[order] = np.column_stack([mean, delta, zscore, ratio, ratio_trend])
+    return out
+
+
+def add_feeder_features(df, window=WINDOW):
+    """Rolling per-feeder history features, added in place in original row order."""
+    if len(df):
+        df[HISTORY_FEATURES] = _compute(df, window)
+    else:
+        for col in HISTORY_FEATURES:
+            df[col] = pd.Series(dtype=float)
+    return df
+
+
+def ensure_feeder_features(df, window=WINDOW):
+    if not set(HISTORY_FEATURES).issubset(df.columns):
+        add_feeder_features(df, window)
+    return df
+
+
+def latest_with_history(recent, window=WINDOW):
+    """Latest reading per feeder with history features computed over the
+    feeder's `recent` readings (e.g. GridDatabase.get_recent_per_feeder)."""
+    recent = add_feeder_features(recent.reset_index(drop=True), window)
+    order = np.lexsort((_time_key(recent), pd.factorize(recent['feeder_id'])[0]))
+    last = (recent.iloc[order]
+                  .drop_duplicates('feeder_id', keep='last')
+                  .sort_values('feeder_id'))
+    return last.reset_index(drop=True)
+
+
+class FeederFeatureCache:
+    """Keeps the last `window` readings per feeder so new days can be
+    featurised without recomputing the whole history."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.tail = None
+
+    def seed(self, history_df):
+        """Start from existing readings (e.g. the dataset the models were
+        trained on) instead of an empty history; only the tail is kept."""
+        cols = _RAW_COLS + [c for c in ('date', 'timestamp') if c in history_df.columns]
+        self.tail = self._tail(history_df[cols])
+        return self
+
+    def _tail(self, df):
+        order = np.lexsort((_time_key(df), pd.factorize(df['feeder_id'])[0]))
+        return (df.iloc[order]
+                  .groupby('feeder_id', observed=True, sort=False)
+                  .tail(self.window)
+                  .reset_index(drop=True))
+
+    def update(self, new_df):
+        cols = _RAW_COLS + [c for c in ('date', 'timestamp') if c in new_df.columns]
+        fresh = new_df[cols].assign(_new=True)
+        combined = fresh if self.tail is None else pd.concat(
+            [self.tail.assign(_new=False), fresh], ignore_index=True)
+
+        feats = _compute(combined, self.window)
+        is_new = combined['_new'].to_numpy()
+        new_df[HISTORY_FEATURES] = feats[is_new]
+
+        self.tail = self._tail(combined.drop(columns='_new'))
+        return new_df
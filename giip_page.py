@@ -5,6 +5,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 import random
 from datetime import datetime
+from theme import minify_css, render_cards
 
 GIIP_CSS = """
 <style>
@@ -41,17 +42,51 @@ GIIP_CSS = """
 .loop-text { color: #8A9BB0; font-style: italic; font-size: 0.88rem; }
 .loop-text span { color: #00C896; font-weight: 600; }
 .live-dot { display: inline-block; width: 8px; height: 8px; background: #00C896; border-radius: 50%; margin-right: 6px; animation: pulse 1.5s infinite; }
+.card-icon { font-size: 1.3rem; }
+.alert-card .card-icon { flex-shrink: 0; margin-top: 2px; }
+.card-title { font-family: Outfit, sans-serif; font-weight: 700; font-size: 0.9rem; color: #E2EAF0; }
+.card-detail { font-size: 0.8rem; color: #8A9BB0; margin-top: 2px; }
+.action-card .card-detail { font-size: 0.78rem; margin-top: 3px; }
+.card-detail strong { color: #E2EAF0; }
+.sensor-id { font-size: 0.7rem; color: #8A9BB0; text-transform: uppercase; letter-spacing: 1px; }
+.sensor-loss { font-family: Outfit, sans-serif; font-size: 1.4rem; font-weight: 700; }
+.sensor-note { font-size: 0.7rem; color: #8A9BB0; }
+.sensor-stats { margin-top: 8px; display: grid; grid-template-columns: 1fr 1fr; gap: 4px; }
+.stat-label { font-size: 0.65rem; color: #8A9BB0; }
+.stat-value { font-size: 0.8rem; color: #E2EAF0; font-weight: 600; }
+.sensor-foot { margin-top: 8px; font-size: 0.65rem; color: #8A9BB0; }
 </style>
 """
+GIIP_CSS = minify_css(GIIP_CSS)
+
+# ── Card templates (filled by theme.render_cards) ────────────────
+SENSOR_CARD = ('<div class="sensor-card" style="border-color:{c}"><div class="sensor-pulse" style="background:{c}"></div>'
+               '<div class="card-icon">{icon}</div><div class="sensor-id">{feeder_id} · {state}</div>'
+               '<div class="sensor-loss" style="color:{lc}">{loss_percentage:.1f}%</div><div class="sensor-note">T&D Loss</div>'
+               '<div class="sensor-stats"><div><div class="stat-label">VOLTAGE</div><div class="stat-value">{voltage}V</div></div>'
+               '<div><div class="stat-label">LOAD</div><div class="stat-value">{load_factor}</div></div>'
+               '<div><div class="stat-label">POWER</div><div class="stat-value">{power_kw}kW</div></div>'
+               '<div><div class="stat-label">TEMP</div><div class="stat-value">{temperature}°C</div></div></div>'
+               '<div class="sensor-foot">🕐 {timestamp} · Smart: {smart}</div></div>')
+ALERT_CARD = ('<div class="alert-card" style="border-color:{sc}"><div class="card-icon">{icon}</div>'
+              '<div style="flex:1"><div class="card-title">{type} DETECTED — {feeder} ({state})</div>'
+              '<div class="card-detail">{detail}</div></div>'
+              '<div class="alert-badge" style="background:{sb};color:{sc};border:1px solid {sc}">{severity}</div></div>')
+ACTION_CARD = ('<div class="action-card"><div style="flex:1"><div class="card-title">{title}</div>'
+               '<div class="card-detail">{detail} · ETA: <strong>{eta}</strong></div></div>'
+               '<div class="action-status" style="background:{sb};color:{sc};border:1px solid {sc}">{status}</div></div>')
 
 def get_live_db_data():
     try:
         from database import GridDatabase
-        from ml_models import prepare_data
+        from features import WINDOW, latest_with_history
+        from ml_models import score
         db = GridDatabase("gridsense.db")
-        raw = db.get_latest_per_feeder()
+        # Latest reading per feeder, featurised over its stored history so the
+        # models see the same rolling features they were trained on
+        raw = db.get_recent_per_feeder(WINDOW)
         if raw is not None and len(raw) > 0:
-            df = prepare_data(raw)
+            df = score(latest_with_history(raw))
             alerts = db.get_unresolved_alerts(limit=10)
             total  = db.get_total_readings()
             return df, alerts, total, db
@@ -78,12 +113,17 @@ def sim_sensor_reading(feeder_id="FEEDER_001", state="Maharashtra"):
         "timestamp": datetime.now().strftime("%H:%M:%S"),
     }
 
-def generate_detections(df):
-    detections = []
-    if df is not None and len(df) > 0:
-        for _, row in df[df['is_suspicious']].head(3).iterrows():
+ALERT_ICONS = {"THEFT":"🚨","HARDWARE":"⚠️","OVERLOAD":"🔶","VOLTAGE":"⚡"}
+
+def generate_detections(df, alerts=None):
+    # Alerts raised by the streaming scorer take precedence over rescoring the snapshot
+    detections = [{"type":a["type"],"severity":a["severity"],"feeder":a["feeder_id"],"state":a.get("state") or "N/A","detail":a.get("detail",""),"icon":ALERT_ICONS.get(a["type"],"🔔")} for a in (alerts or [])[:5]]
+    if not detections and df is not None and len(df) > 0:
+        susp = df.iloc[np.flatnonzero(df['is_suspicious'].to_numpy())[:3]]
+        for row in susp.to_dict('records'):
             detections.append({"type":"THEFT","severity":"CRITICAL" if row['loss_percentage']>28 else "HIGH","feeder":row['feeder_id'],"state":row.get('state','N/A'),"detail":f"Loss {row['loss_percentage']:.1f}% — anomalous consumption pattern","icon":"🚨"})
-        for _, row in df[df['risk_label']=='HIGH'].head(2).iterrows():
+        high = df.iloc[np.flatnonzero((df['risk_label']=='HIGH').to_numpy())[:2]]
+        for row in high.to_dict('records'):
             detections.append({"type":"HARDWARE","severity":"HIGH","feeder":row['feeder_id'],"state":row.get('state','N/A'),"detail":f"Transformer age {int(row.get('transformer_age',0))}yr — predicted failure in 3-6 wks","icon":"⚠️"})
     if not detections:
         detections = [
@@ -126,20 +166,20 @@ def show_giip_page():
     feeders_to_show = ["FEEDER_001","FEEDER_007","FEEDER_015","FEEDER_023","FEEDER_033","FEEDER_041"]
     sensors = []
     if df is not None and len(df) >= 6:
-        for _, row in df.head(6).iterrows():
+        for row in df.head(6).to_dict('records'):
             sensors.append({"feeder_id":row.get("feeder_id","N/A"),"state":row.get("state","N/A"),"loss_percentage":row.get("loss_percentage",0),"voltage":row.get("voltage",230),"current_amp":row.get("current_amp",50),"power_kw":row.get("power_kw",100),"units_injected":row.get("units_injected",500),"units_billed":row.get("units_billed",450),"temperature":row.get("temperature",30),"load_factor":row.get("load_factor",0.7),"voltage_fluctuation":row.get("voltage_fluctuation",2.0),"transformer_age":row.get("transformer_age",10),"smart_meter":row.get("smart_meter",True),"timestamp":datetime.now().strftime("%H:%M:%S")})
     else:
         sensors = [sim_sensor_reading(fid,s) for fid,s in zip(feeders_to_show,["Maharashtra","UP","Bihar","Gujarat","Tamil Nadu","Rajasthan"])]
 
     colors = ["#00C896","#00BCD4","#F5A623","#7B5EA7","#dc2626","#16a34a"]
     icons  = ["⚡","🔌","🌡️","📊","⚙️","📡"]
-    html_sensors = '<div class="sensor-grid">'
+    cards = []
     for i, s in enumerate(sensors):
         c  = colors[i % len(colors)]
         lc = "#dc2626" if s["loss_percentage"] > 25 else ("#f59e0b" if s["loss_percentage"] > 15 else "#00C896")
-        html_sensors += f'<div class="sensor-card" style="border-color:{c}"><div class="sensor-pulse" style="background:{c}"></div><div style="font-size:1.3rem">{icons[i]}</div><div style="font-size:0.7rem;color:#8A9BB0;text-transform:uppercase;letter-spacing:1px">{s["feeder_id"]} · {s["state"]}</div><div style="font-family:Outfit,sans-serif;font-size:1.4rem;font-weight:700;color:{lc}">{s["loss_percentage"]:.1f}%</div><div style="font-size:0.7rem;color:#8A9BB0">T&D Loss</div><div style="margin-top:8px;display:grid;grid-template-columns:1fr 1fr;gap:4px;"><div><div style="font-size:0.65rem;color:#8A9BB0">VOLTAGE</div><div style="font-size:0.8rem;color:#E2EAF0;font-weight:600">{s["voltage"]}V</div></div><div><div style="font-size:0.65rem;color:#8A9BB0">LOAD</div><div style="font-size:0.8rem;color:#E2EAF0;font-weight:600">{s["load_factor"]}</div></div><div><div style="font-size:0.65rem;color:#8A9BB0">POWER</div><div style="font-size:0.8rem;color:#E2EAF0;font-weight:600">{s["power_kw"]}kW</div></div><div><div style="font-size:0.65rem;color:#8A9BB0">TEMP</div><div style="font-size:0.8rem;color:#E2EAF0;font-weight:600">{s["temperature"]}°C</div></div></div><div style="margin-top:8px;font-size:0.65rem;color:#8A9BB0">🕐 {s["timestamp"]} · Smart: {"✅" if s["smart_meter"] else "❌"}</div></div>'
-    html_sensors += '</div>'
-    st.markdown(html_sensors, unsafe_allow_html=True)
+        cards.append({**{k: s[k] for k in ("feeder_id","state","loss_percentage","voltage","load_factor","power_kw","temperature","timestamp")},
+                      "c":c, "lc":lc, "icon":icons[i], "smart":"✅" if s["smart_meter"] else "❌"})
+    st.markdown(f'<div class="sensor-grid">{render_cards(SENSOR_CARD, cards)}</div>', unsafe_allow_html=True)
 
     sense_df = pd.DataFrame(sensors)[["feeder_id","loss_percentage"]]
     fig_s = px.bar(sense_df, x="feeder_id", y="loss_percentage", color="loss_percentage", color_continuous_scale=["#00C896","#f59e0b","#dc2626"], height=200, labels={"loss_percentage":"Loss %","feeder_id":""})
@@ -152,14 +192,11 @@ def show_giip_page():
     # ── DETECT ────────────────────────────────────────────────────
     st.markdown('<div class="step-header" style="background:#00BCD418;border-left:4px solid #00BCD4;"><div class="step-num" style="background:#00BCD4;">02</div><div><div class="step-title" style="color:#00BCD4;">DETECT</div><div style="font-size:0.8rem;color:#8A9BB0;font-style:italic;">Intelligence Layer — Isolation Forest · Random Forest · Gemini AI</div></div><div class="step-layer" style="color:#8A9BB0;">Flags theft · Predicts failures 3-6 weeks ahead</div></div>', unsafe_allow_html=True)
 
-    detections = generate_detections(df)
+    detections = generate_detections(df, db_alerts)
     sev_c = {"CRITICAL":"#dc2626","HIGH":"#f59e0b","MEDIUM":"#7B5EA7"}
     sev_b = {"CRITICAL":"#dc262622","HIGH":"#f59e0b22","MEDIUM":"#7B5EA722"}
-    html_det = ""
-    for d in detections:
-        sc = sev_c.get(d["severity"],"#8A9BB0"); sb = sev_b.get(d["severity"],"#1E3A5F")
-        html_det += f'<div class="alert-card" style="border-color:{sc}"><div style="font-size:1.3rem;flex-shrink:0;margin-top:2px">{d["icon"]}</div><div style="flex:1"><div style="font-family:Outfit,sans-serif;font-weight:700;font-size:0.9rem;color:#E2EAF0">{d["type"]} DETECTED — {d["feeder"]} ({d["state"]})</div><div style="font-size:0.8rem;color:#8A9BB0;margin-top:2px">{d["detail"]}</div></div><div class="alert-badge" style="background:{sb};color:{sc};border:1px solid {sc}">{d["severity"]}</div></div>'
-    st.markdown(html_det, unsafe_allow_html=True)
+    cards = [{**d, "sc":sev_c.get(d["severity"],"#8A9BB0"), "sb":sev_b.get(d["severity"],"#1E3A5F")} for d in detections]
+    st.markdown(render_cards(ALERT_CARD, cards), unsafe_allow_html=True)
 
     if df is not None and len(df) > 5:
         fig_d = px.scatter(df, x="units_injected", y="loss_percentage", color="is_suspicious", color_discrete_map={True:"#dc2626",False:"#00C896"}, hover_data=["feeder_id","state"], height=220)
@@ -178,11 +215,8 @@ def show_giip_page():
 
     actions = generate_actions(detections)
     sc_map = {"DISPATCHED":("#dc2626","#dc262622"),"IN PROGRESS":("#f59e0b","#f59e0b22"),"SCHEDULED":("#7B5EA7","#7B5EA722"),"AUTO":("#00C896","#00C89622")}
-    html_act = ""
-    for a in actions:
-        sc, sb = sc_map.get(a["status"],("#8A9BB0","#1E3A5F22"))
-        html_act += f'<div class="action-card"><div style="flex:1"><div style="font-family:Outfit,sans-serif;font-weight:700;font-size:0.9rem;color:#E2EAF0">{a["title"]}</div><div style="font-size:0.78rem;color:#8A9BB0;margin-top:3px">{a["detail"]} · ETA: <strong style="color:#E2EAF0">{a["eta"]}</strong></div></div><div class="action-status" style="background:{sb};color:{sc};border:1px solid {sc}">{a["status"]}</div></div>'
-    st.markdown(html_act, unsafe_allow_html=True)
+    cards = [{**a, **dict(zip(("sc","sb"), sc_map.get(a["status"],("#8A9BB0","#1E3A5F22"))))} for a in actions]
+    st.markdown(render_cards(ACTION_CARD, cards), unsafe_allow_html=True)
 
     if actions:
         act_df = pd.DataFrame([{"action":(a["title"][:28]+"…" if len(a["title"])>28 else a["title"]),"roi_cr":round(random.uniform(0.5,8.0),1)} for a in actions])
@@ -0,0 +1,367 @@
+"""
+ingest.py — batched reading ingest for the GIIP SENSE layer.
+
+    python ingest.py serve    --port 8765 --db gridsense.db
+    python ingest.py simulate --url http://127.0.0.1:8765 --rate 50000
+
+Readings use the giip_page.sim_sensor_reading schema. The HTTP endpoint
+validates each batch and puts it on a bounded queue; a single writer
+thread drains the queue into GridDatabase with bulk inserts. When the
+queue is full the endpoint answers 503 + Retry-After, which is the
+back-pressure signal for senders. A batch the database refuses is counted
+as rejected and the writer moves on; GET /health reports the counters and
+answers 503 if the writer thread is no longer running.
+
+When fitted models are registered (ml_models.latest_models), each written
+micro-batch is handed to a separate scorer thread that runs
+stream_scoring.StreamScorer and records THEFT / HARDWARE alerts in the
+alerts table. Its queue is bounded too: when scoring falls behind, batches
+are left unscored (counted in scoring_dropped) rather than slowing writes.
+"""
+import json
+import math
+import os
+import re
+import queue
+import threading
+import time
+import urllib.request
+import urllib.error
+from datetime import datetime, time as dt_time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from database import GridDatabase
+
+DEFAULT_PORT = 8765
+MAX_QUEUED_BATCHES = 256
+MAX_SCORE_BATCHES = 8
+WRITE_BATCH_ROWS = 20_000
+FLUSH_INTERVAL_SECONDS = 0.05
+MAX_BODY_BYTES = 32 * 2**20
+
+NUMERIC_FIELDS = {
+    "loss_percentage":     (0, 100),
+    "voltage":             (0, 1000),
+    "current_amp":         (0, 10_000),
+    "power_kw":            (0, 100_000),
+    "units_injected":      (0, 1e7),
+    "units_billed":        (0, 1e7),
+    "temperature":         (-50, 80),
+    "load_factor":         (0, 1.5),
+    "voltage_fluctuation": (0, 100),
+    "transformer_age":     (0, 100),
+    "outage_hours":        (0, 744),
+}
+REQUIRED_FIELDS = ("feeder_id", "loss_percentage", "units_injected", "units_billed")
+MAX_TEXT_LENGTH = 64
+# feeder_id and state end up in dashboard cards, so only plain names pass
+FEEDER_ID_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+STATE_PATTERN = re.compile(r"[A-Za-z][A-Za-z .&-]{0,63}")
+
+
+def _valid_timestamp(value):
+    # ISO date-time, or the bare HH:MM:SS that sim_sensor_reading emits
+    try:
+        if len(value) == 8:
+            dt_time.fromisoformat(value)
+        else:
+            datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def validate(reading):
+    """Return an error string, or None if the reading is usable."""
+    if not isinstance(reading, dict):
+        return "reading must be an object"
+    for f in REQUIRED_FIELDS:
+        if reading.get(f) is None:
+            return f"missing {f}"
+    if not isinstance(reading["feeder_id"], str) or not FEEDER_ID_PATTERN.fullmatch(reading["feeder_id"]):
+        return "feeder_id must be 1-64 letters, digits, '_', '.' or '-'"
+    state = reading.get("state")
+    if state is not None and (not isinstance(state, str) or not STATE_PATTERN.fullmatch(state)):
+        return "state must be a name of at most 64 letters, spaces, '.', '&' or '-'"
+    ts = reading.get("timestamp")
+    if ts is not None and (not isinstance(ts, str) or len(ts) > MAX_TEXT_LENGTH
+                           or not _valid_timestamp(ts)):
+        return "timestamp must be ISO 8601 or HH:MM:SS"
+    if reading.get("smart_meter") not in (None, True, False):
+        return "smart_meter must be a boolean"
+    for f, (lo, hi) in NUMERIC_FIELDS.items():
+        v = reading.get(f)
+        if v is None:
+            continue
+        if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v):
+            return f"{f} must be a number"
+        if not lo <= v <= hi:
+            return f"{f} out of range [{lo}, {hi}]"
+    return None
+
+
+class IngestPipeline:
+    def __init__(self, db_path="gridsense.db", max_batches=MAX_QUEUED_BATCHES,
+                 write_rows=WRITE_BATCH_ROWS, flush_interval=FLUSH_INTERVAL_SECONDS,
+                 scorer=None, max_score_batches=MAX_SCORE_BATCHES):
+        self.db = GridDatabase(db_path)
+        self.scorer = scorer
+        self.queue = queue.Queue(maxsize=max_batches)
+        self.write_rows = write_rows
+        self.flush_interval = flush_interval
+        self.stats = {"accepted": 0, "rejected": 0, "written": 0, "throttled": 0, "alerts": 0,
+                      "scoring_errors": 0, "scoring_dropped": 0}
+        self._stats_lock = threading.Lock()
+        self._running = True
+        self._writer = threading.Thread(target=self._drain, name="ingest-writer", daemon=True)
+        self._writer.start()
+        self._score_queue = queue.Queue(maxsize=max_score_batches)
+        self._scorer_thread = None
+        if scorer is not None:
+            self._scorer_thread = threading.Thread(target=self._score_loop,
+                                                   name="ingest-scorer", daemon=True)
+            self._scorer_thread.start()
+
+    def _count(self, key, n):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def submit(self, readings):
+        """Validate and enqueue a batch. Returns (accepted, errors) or None if
+        the queue is full and the caller should retry later."""
+        good, errors = [], []
+        for i, r in enumerate(readings):
+            err = validate(r)
+            if err:
+                errors.append({"index": i, "error": err})
+            else:
+                good.append(r)
+        if good:
+            try:
+                self.queue.put_nowait(good)
+            except queue.Full:
+                self._count("throttled", len(good))
+                return None
+        self._count("accepted", len(good))
+        self._count("rejected", len(errors))
+        return len(good), errors
+
+    def _drain(self):
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        while self._running or not self.queue.empty() or pending:
+            try:
+                pending.extend(self.queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            if pending and (len(pending) >= self.write_rows or time.monotonic() >= deadline
+                            or not self._running):
+                self._flush(pending)
+                pending = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, readings):
+        try:
+            self._count("written", self.db.insert_readings(readings))
+        except Exception as e:
+            # Drop the batch, keep the writer alive for the ones behind it
+            print(f"⚠️ Ingest batch of {len(readings)} readings not written: {e}")
+            self._count("rejected", len(readings))
+            return
+        if self._scorer_thread is None:
+            return
+        try:
+            self._score_queue.put_nowait(readings)
+        except queue.Full:
+            # Scoring is behind; the readings are stored, just not scored
+            self._count("scoring_dropped", len(readings))
+
+    def _score_loop(self):
+        while True:
+            readings = self._score_queue.get()
+            if readings is None:
+                return
+            self._score(readings)
+
+    def _score(self, readings):
+        try:
+            alerts = self.scorer.process(readings)
+        except Exception as e:
+            # Keep ingesting and scoring; one bad batch must not stall the
+            # writer or switch alerts off for the rest of the process
+            print(f"⚠️ Scoring skipped for {len(readings)} readings: {e}")
+            self._count("scoring_errors", 1)
+            return
+        if alerts:
+            self._count("alerts", self.db.add_alerts(alerts))
+
+    def health(self):
+        out = {**self.stats, "queued_batches": self.queue.qsize(),
+               "writer_alive": self._writer.is_alive()}
+        if self.scorer is not None:
+            out["scoring_us_per_reading"] = round(self.scorer.us_per_reading, 2)
+            out["unscored_readings"] = self.scorer.skipped
+            out["scoring_queued_batches"] = self._score_queue.qsize()
+            out["scorer_alive"] = self._scorer_thread.is_alive()
+        return out
+
+    def close(self):
+        self._running = False
+        self._writer.join()
+        if self._scorer_thread is not None:
+            self._score_queue.put(None)
+            self._scorer_thread.join()
+        self.db.close()
+
+
+def make_handler(pipeline):
+    class IngestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, code, payload, headers=()):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in headers:
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._reply(404, {"error": "not found"})
+            health = pipeline.health()
+            self._reply(200 if health["writer_alive"] else 503, health)
+
+        def do_POST(self):
+            if self.path != "/readings":
+                return self._reply(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length", 0))
+            if length <= 0 or length > MAX_BODY_BYTES:
+                return self._reply(413 if length else 400, {"error": "bad body size"})
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self._reply(400, {"error": "invalid JSON"})
+            readings = body.get("readings") if isinstance(body, dict) else body
+            if not isinstance(readings, list):
+                return self._reply(400, {"error": "expected a list of readings"})
+            result = pipeline.submit(readings)
+            if result is None:
+                return self._reply(503, {"error": "ingest queue full"}, [("Retry-After", "1")])
+            accepted, errors = result
+            self._reply(202, {"accepted": accepted, "rejected": errors[:50]})
+
+    return IngestHandler
+
+
+def make_scorer():
+    # sklearn is only imported when scoring is actually enabled
+    from ml_models import LATEST_PATH
+    if not os.path.exists(LATEST_PATH):
+        print("ℹ️  No trained models registered — ingesting without scoring")
+        return None
+    from stream_scoring import StreamScorer
+    return StreamScorer()
+
+
+def serve(port=DEFAULT_PORT, db_path="gridsense.db", host="127.0.0.1", score=True):
+    pipeline = IngestPipeline(db_path, scorer=make_scorer() if score else None)
+    server = ThreadingHTTPServer((host, port), make_handler(pipeline))
+    print(f"⚡ Ingest listening on http://{host}:{port}/readings → {db_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pipeline.close()
+
+
+# ── Local meter simulator ─────────────────────────────────────────
+STATES = ["Maharashtra", "Uttar Pradesh", "Rajasthan", "Gujarat",
+          "Bihar", "Tamil Nadu", "West Bengal", "Madhya Pradesh"]
+
+
+def simulate_batch(n, n_feeders=1000, rng=None):
+    """n readings in the sim_sensor_reading schema, generated column-wise."""
+    rng = rng or np.random.default_rng()
+    fid = rng.integers(0, n_feeders, n)
+    loss = rng.uniform(5, 32, n).round(2)
+    inj = rng.uniform(300, 2000, n).round(1)
+    ts = datetime.now().isoformat(timespec="seconds")
+    cols = {
+        "loss_percentage": loss.tolist(),
+        "voltage": rng.uniform(218, 243, n).round(1).tolist(),
+        "current_amp": rng.uniform(10, 120, n).round(1).tolist(),
+        "power_kw": rng.uniform(50, 400, n).round(1).tolist(),
+        "units_injected": inj.tolist(),
+        "units_billed": (inj * (1 - loss / 100)).round(1).tolist(),
+        "temperature": rng.uniform(18, 44, n).round(1).tolist(),
+        "load_factor": rng.uniform(0.45, 0.95, n).round(2).tolist(),
+        "voltage_fluctuation": rng.uniform(0.5, 9.5, n).round(1).tolist(),
+        "transformer_age": (fid % 27 + 2).tolist(),
+        "smart_meter": (fid % 2 == 0).tolist(),
+    }
+    keys = list(cols)
+    return [
+        {"feeder_id": f"FEEDER_{f:03d}", "state": STATES[f % len(STATES)],
+         "timestamp": ts, **dict(zip(keys, vals))}
+        for f, *vals in zip(fid.tolist(), *cols.values())
+    ]
+
+
+def simulate(url=f"http://127.0.0.1:{DEFAULT_PORT}", rate=50_000, batch_size=5_000,
+             seconds=10, n_feeders=1000):
+    """POST simulated batches at ~rate readings/s, honouring 503 back-pressure."""
+    rng = np.random.default_rng()
+    sent = throttled = 0
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        body = json.dumps(simulate_batch(batch_size, n_feeders, rng)).encode()
+        req = urllib.request.Request(f"{url}/readings", data=body,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(req).read()
+            sent += batch_size
+        except urllib.error.HTTPError as e:
+            if e.code != 503:
+                raise
+            throttled += 1
+            time.sleep(float(e.headers.get("Retry-After", 1)))
+        ahead = sent / rate - (time.monotonic() - start)
+        if ahead > 0:
+            time.sleep(ahead)
+    elapsed = time.monotonic() - start
+    print(f"📡 Sent {sent:,} readings in {elapsed:.1f}s "
+          f"({sent / elapsed:,.0f}/s), throttled {throttled}x")
+    return sent
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="GridSense reading ingest")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--db", default="gridsense.db")
+    p_serve.add_argument("--no-score", action="store_true",
+                         help="store readings without streaming anomaly scoring")
+    p_sim = sub.add_parser("simulate")
+    p_sim.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}")
+    p_sim.add_argument("--rate", type=int, default=50_000)
+    p_sim.add_argument("--batch", type=int, default=5_000)
+    p_sim.add_argument("--seconds", type=float, default=10)
+    p_sim.add_argument("--feeders", type=int, default=1000)
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        serve(args.port, args.db, score=not args.no_score)
+    else:
+        simulate(args.url, args.rate, args.batch, args.seconds, args.feeders)
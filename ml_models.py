@@ -1,60 +1,330 @@
+import os
+import copy
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+import joblib
+import sklearn
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest, RandomForestClassifier
+from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
+from features import ensure_feeder_features, FeederFeatureCache
 
 
-def run_anomaly_detection(df):
-    features = [
-        'units_injected_kwh', 'units_billed_kwh',
-        'loss_percentage', 'load_factor',
-        'temperature_celsius', 'voltage_fluctuation'
-    ]
-
-    X = df[features]
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-
-    model = IsolationForest(contamination=0.12, random_state=42)
-    df['anomaly_score'] = model.fit_predict(X_scaled)
-    df['is_suspicious'] = df['anomaly_score'] == -1
+ANOMALY_FEATURES = [
+    'units_injected_kwh', 'units_billed_kwh',
+    'loss_percentage', 'load_factor',
+    'temperature_celsius', 'voltage_fluctuation',
+    # per-feeder history, see features.py
+    'loss_delta', 'loss_zscore', 'billing_ratio_trend'
+]
+RISK_FEATURES = [
+    'transformer_age_years', 'load_factor',
+    'temperature_celsius', 'loss_percentage',
+    'voltage_fluctuation', 'outage_hours_monthly'
+]
 
-    return df
+# ── Model registry ────────────────────────────────────────────────
+# Fitted models are stored as joblib artifacts keyed by model kind, feature
+# schema and a hash of the training data, so the same data never refits.
+MODEL_DIR = 'models'
+ARTIFACT_VERSION = 3
+LATEST_PATH = os.path.join(MODEL_DIR, 'latest.json')
+SANITY_ROWS = 64      # rows scored before a top-up is registered
+KEEP_ARTIFACTS = 3    # newest artifacts kept per kind, plus whatever latest.json names
+N_JOBS = -1           # every core for tree building and prediction
+_loaded = {}
+_latest = (None, None)
+last_timings = {}     # wall time per stage of the most recent train/update
 
 
-def run_risk_model(df):
-    df['high_risk'] = (
+def _digest(*parts):
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else str(p).encode())
+    return h.hexdigest()
+
+
+def data_hash(df, features):
+    hashed = pd.util.hash_pandas_object(df[features], index=False).values
+    return _digest(hashed.tobytes())[:16]
+
+
+def artifact_key(kind, features, dhash):
+    schema = _digest(ARTIFACT_VERSION, sklearn.__version__, *features)[:8]
+    return f"{kind}-{schema}-{dhash}"
+
+
+def _artifact_path(key):
+    return os.path.join(MODEL_DIR, f"{key}.joblib")
+
+
+def _read_latest():
+    if not os.path.exists(LATEST_PATH):
+        return {}
+    with open(LATEST_PATH) as f:
+        return json.load(f)
+
+
+def _write_latest(kind, key):
+    path = LATEST_PATH
+    latest = _read_latest()
+    latest[kind] = key
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(latest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_model(key):
+    if key not in _loaded:
+        _loaded[key] = joblib.load(_artifact_path(key), mmap_mode='r')
+    return _loaded[key]
+
+
+def save_model(kind, key, model):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tmp = f"{_artifact_path(key)}.tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, _artifact_path(key))
+    _write_latest(kind, key)
+    _loaded[key] = model
+    prune_models(kind)
+
+
+def prune_models(kind, keep=None):
+    """Delete all but the `keep` newest artifacts of one kind; the artifact
+    latest.json points to is never deleted."""
+    keep = KEEP_ARTIFACTS if keep is None else keep
+    pinned = set(_read_latest().values())
+    paths = [os.path.join(MODEL_DIR, f) for f in os.listdir(MODEL_DIR)
+             if f.startswith(f"{kind}-") and f.endswith('.joblib')]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    removed = []
+    for path in paths[keep:]:
+        key = os.path.basename(path)[:-len('.joblib')]
+        if key in pinned:
+            continue
+        os.remove(path)
+        _loaded.pop(key, None)
+        removed.append(key)
+    return removed
+
+
+def get_or_train(kind, df, features, fit):
+    key = artifact_key(kind, features, data_hash(df, features))
+    if key in _loaded or os.path.exists(_artifact_path(key)):
+        # Seen this data before: reuse the fit, but make it latest again so
+        # score() and the live paths use the same models as the caller
+        if _read_latest().get(kind) != key:
+            _write_latest(kind, key)
+        return load_model(key)
+    model = fit(df)
+    save_model(kind, key, model)
+    return model
+
+
+def latest_models():
+    # Reloaded only when latest.json changes, i.e. after a retrain.
+    global _latest
+    mtime = os.path.getmtime(LATEST_PATH)
+    if _latest[0] != mtime:
+        with open(LATEST_PATH) as f:
+            latest = json.load(f)
+        _latest = (mtime, (load_model(latest['anomaly']), load_model(latest['risk'])))
+    return _latest[1]
+
+
+# ── Training ──────────────────────────────────────────────────────
+@contextmanager
+def _timed(stage, timings):
+    t0 = time.perf_counter()
+    yield
+    timings[stage] = round(time.perf_counter() - t0, 4)
+
+
+def fit_anomaly_model(df):
+    model = make_pipeline(
+        StandardScaler(),
+        IsolationForest(contamination=0.12, random_state=42, n_jobs=N_JOBS))
+    return model.fit(df[ANOMALY_FEATURES].to_numpy())
+
+
+def risk_target(df):
+    return (
         (df['transformer_age_years'] > 20) &
         (df['loss_percentage'] > 20)
     ).astype(int)
 
-    feat_cols = [
-        'transformer_age_years', 'load_factor',
-        'temperature_celsius', 'loss_percentage',
-        'voltage_fluctuation', 'outage_hours_monthly'
-    ]
-
-    X = df[feat_cols]
-    y = df['high_risk']
 
+def fit_risk_model(df):
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
+        df[RISK_FEATURES].to_numpy(), risk_target(df).to_numpy(),
+        test_size=0.2, random_state=42
     )
+    rf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=N_JOBS)
+    return rf.fit(X_train, y_train)
 
-    rf = RandomForestClassifier(n_estimators=100, random_state=42)
-    rf.fit(X_train, y_train)
 
-    df['failure_risk_score'] = rf.predict_proba(X[feat_cols])[:, 1]
-    df['risk_label'] = df['failure_risk_score'].apply(
-        lambda x: 'HIGH' if x > 0.7 else ('MEDIUM' if x > 0.4 else 'LOW')
-    )
+def train(df, verbose=False):
+    """Fit (or load, if this data was seen before) both models."""
+    timings = {}
+    with _timed('features', timings):
+        ensure_feeder_features(df)
+    with _timed('anomaly', timings):
+        anomaly = get_or_train('anomaly', df, ANOMALY_FEATURES, fit_anomaly_model)
+    with _timed('risk', timings):
+        risk = get_or_train('risk', df, RISK_FEATURES, fit_risk_model)
+    _report(timings, verbose)
+    return anomaly, risk
+
+
+def update_models(df_new, extra_trees=20, verbose=False, history=None):
+    """Warm-start the latest models with extra trees grown on new readings.
+
+    Existing trees are kept as-is; the scaler and class set come from the
+    original fit, so this suits daily top-ups between full retrains. Pass the
+    readings that precede df_new as `history` so each feeder's rolling
+    features continue from its previous tail rather than restarting at zero.
+    The risk forest is left alone when the batch doesn't contain every class
+    it was trained on, and nothing is registered unless both models can
+    score a sample of the batch.
+    """
+    timings = {}
+    anomaly, risk = (copy.deepcopy(m) for m in latest_models())
+    latest = _read_latest()
+
+    with _timed('features', timings):
+        if history is not None:
+            FeederFeatureCache().seed(history).update(df_new)
+        else:
+            ensure_feeder_features(df_new)
+    X_anomaly = df_new[ANOMALY_FEATURES].to_numpy()
+    X_risk = df_new[RISK_FEATURES].to_numpy()
+
+    with _timed('anomaly', timings):
+        forest = anomaly[-1]
+        forest.set_params(warm_start=True, n_estimators=forest.n_estimators + extra_trees)
+        forest.fit(anomaly[:-1].transform(X_anomaly))
+
+    with _timed('risk', timings):
+        y = risk_target(df_new).to_numpy()
+        # Trees grown on fewer classes than the forest has break predict_proba
+        risk_updated = np.array_equal(np.unique(y), risk.classes_)
+        if risk_updated:
+            risk.set_params(warm_start=True, n_estimators=risk.n_estimators + extra_trees)
+            risk.fit(X_risk, y)
+        elif verbose:
+            print(f"ℹ️  Risk top-up skipped: batch has classes {np.unique(y).tolist()}, "
+                  f"model has {risk.classes_.tolist()}")
+
+    check_models(anomaly, risk, X_anomaly, X_risk)
+    dhash = _digest(latest['anomaly'], data_hash(df_new, ANOMALY_FEATURES))[:16]
+    save_model('anomaly', artifact_key('anomaly', ANOMALY_FEATURES, dhash), anomaly)
+    if risk_updated:
+        dhash = _digest(latest['risk'], data_hash(df_new, RISK_FEATURES))[:16]
+        save_model('risk', artifact_key('risk', RISK_FEATURES, dhash), risk)
+
+    _report(timings, verbose)
+    return anomaly, risk
+
+
+def check_models(anomaly, risk, X_anomaly, X_risk, rows=SANITY_ROWS):
+    """Raise ValueError unless both models score a sample with the expected shapes."""
+    if len(risk.classes_) != 2:
+        raise ValueError(f"refusing to register risk model with classes {risk.classes_.tolist()}")
+    anomaly_score, risk_score = score_arrays(X_anomaly[:rows], X_risk[:rows], (anomaly, risk))
+    n = min(rows, len(X_anomaly))
+    if anomaly_score.shape != (n,) or risk_score.shape != (n,):
+        raise ValueError(f"refusing to register models: sample scored with shapes "
+                         f"{anomaly_score.shape} and {risk_score.shape}, expected ({n},)")
+
+
+def _report(timings, verbose):
+    last_timings.clear()
+    last_timings.update(timings)
+    if verbose:
+        for stage, secs in timings.items():
+            print(f"⏱️  {stage:<8} {secs:.3f}s")
+
+
+# ── Scoring ───────────────────────────────────────────────────────
+RISK_LEVELS = ['LOW', 'MEDIUM', 'HIGH']
+
+
+def risk_labels(scores):
+    codes = np.select([scores > 0.7, scores > 0.4], [2, 1], default=0)
+    return pd.Categorical.from_codes(codes, categories=RISK_LEVELS, ordered=True)
+
+
+def score_arrays(X_anomaly, X_risk, models=None):
+    anomaly, risk = models or latest_models()
+    anomaly_score = anomaly.predict(X_anomaly)
+    risk_score = risk.predict_proba(X_risk)[:, 1]
+    return anomaly_score, risk_score
+
+
+def score(df, models=None):
+    """Score any batch with already-fitted models; adds columns in place."""
+    ensure_feeder_features(df)
+    anomaly_score, risk_score = score_arrays(
+        df[ANOMALY_FEATURES].to_numpy(), df[RISK_FEATURES].to_numpy(), models)
+    df['anomaly_score'] = anomaly_score.astype(np.int8)
+    df['is_suspicious'] = anomaly_score == -1
+    df['high_risk'] = risk_target(df).astype(np.int8)
+    df['failure_risk_score'] = risk_score.astype(np.float32)
+    df['risk_label'] = risk_labels(risk_score)
+    return df
+
+
+def run_anomaly_detection(df):
+    ensure_feeder_features(df)
+    model = get_or_train('anomaly', df, ANOMALY_FEATURES, fit_anomaly_model)
+    df['anomaly_score'] = model.predict(df[ANOMALY_FEATURES].to_numpy())
+    df['is_suspicious'] = df['anomaly_score'] == -1
+
+    return df
+
+
+def run_risk_model(df):
+    df['high_risk'] = risk_target(df)
+    rf = get_or_train('risk', df, RISK_FEATURES, fit_risk_model)
+
+    df['failure_risk_score'] = rf.predict_proba(df[RISK_FEATURES].to_numpy())[:, 1]
+    df['risk_label'] = risk_labels(df['failure_risk_score'].to_numpy())
 
     return df
 
 
 # ✅ THIS IS THE MISSING FUNCTION — it was not included before
 def prepare_data(df):
-    df = run_anomaly_detection(df)
-    df = run_risk_model(df)
-    return df
+    return score(df, train(df))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Train or top up the GridSense models")
+    parser.add_argument('data', nargs='?', default='grid_data.csv')
+    parser.add_argument('--update', action='store_true',
+                        help="warm-start the latest models instead of a full fit")
+    parser.add_argument('--extra-trees', type=int, default=20)
+    parser.add_argument('--history', help="readings preceding DATA, used to seed "
+                                          "rolling features for --update")
+    args = parser.parse_args()
+
+    def read(path):
+        if os.path.isdir(path):
+            from storage import read_grid_dataset
+            return read_grid_dataset(path)
+        return pd.read_csv(path)
+
+    data = read(args.data)
+    if args.update:
+        history = read(args.history) if args.history else None
+        update_models(data, args.extra_trees, verbose=True, history=history)
+    else:
+        train(data, verbose=True)
@@ -0,0 +1,173 @@
+import os
+import shutil
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+DATASET_DIR = 'grid_data'
+SNAPSHOT_PATH = os.path.join('cache', 'grid_processed.arrow')
+
+# In-memory schema for the grid dataset: applied at load, kept through
+# ml_models.score and features.add_feeder_features.
+COMPACT_DTYPES = {
+    'feeder_id':             'category',
+    'state':                 'category',
+    'date':                  'datetime64[ns]',
+    'units_injected_kwh':    'float32',
+    'units_billed_kwh':      'float32',
+    'loss_percentage':       'float32',
+    'transformer_age_years': 'int8',
+    'temperature_celsius':   'float32',
+    'load_factor':           'float32',
+    'smart_meter_installed': 'bool',
+    'voltage_fluctuation':   'float32',
+    'outage_hours_monthly':  'float32',
+    'anomaly_score':         'int8',
+    'is_suspicious':         'bool',
+    'high_risk':             'int8',
+    'failure_risk_score':    'float32',
+    'risk_label':            'category',
+}
+
+# Explicit on-disk types — partition columns live in the directory names.
+FILE_SCHEMA = pa.schema([
+    ('feeder_id',             pa.dictionary(pa.int32(), pa.string())),
+    ('date',                  pa.timestamp('ms')),
+    ('units_injected_kwh',    pa.float32()),
+    ('units_billed_kwh',      pa.float32()),
+    ('loss_percentage',       pa.float32()),
+    ('transformer_age_years', pa.int8()),
+    ('temperature_celsius',   pa.float32()),
+    ('load_factor',           pa.float32()),
+    ('smart_meter_installed', pa.bool_()),
+    ('voltage_fluctuation',   pa.float32()),
+    ('outage_hours_monthly',  pa.float32()),
+])
+PARTITIONING = ds.partitioning(
+    pa.schema([('state', pa.string()), ('month', pa.string())]), flavor='hive')
+
+
+def compact(df):
+    """Cast known columns to COMPACT_DTYPES in place and return df."""
+    for col, dtype in COMPACT_DTYPES.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype.startswith('datetime'):
+            df[col] = pd.to_datetime(df[col]).astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def bytes_per_row(df):
+    return df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+def memory_report(df):
+    """Bytes per row before/after compacting a copy of df."""
+    before = bytes_per_row(df)
+    after = bytes_per_row(compact(df.copy()))
+    return {'rows': len(df), 'bytes_per_row_before': round(before, 1),
+            'bytes_per_row_after': round(after, 1), 'reduction': round(before / after, 2)}
+
+
+def _month_labels(dates):
+    months = pd.Categorical(pd.to_datetime(dates).values.astype('datetime64[M]'))
+    return months.rename_categories(months.categories.strftime('%Y-%m'))
+
+
+def _to_table(df):
+    table = pa.Table.from_pandas(
+        df[FILE_SCHEMA.names].assign(date=pd.to_datetime(df['date'])),
+        preserve_index=False).cast(FILE_SCHEMA)
+    return (table.append_column('state', pa.array(df['state'].astype(str), pa.string()))
+                 .append_column('month', pa.array(_month_labels(df['date']).astype(str), pa.string())))
+
+
+def write_grid_dataset(chunks, root=DATASET_DIR):
+    # Accepts a DataFrame or any iterable of DataFrames (e.g. iter_grid_chunks),
+    # writing one set of state/month Parquet files per chunk. Files go to a
+    # sibling directory that replaces root once complete, so a rewrite never
+    # keeps partitions from the previous dataset.
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    root = os.path.abspath(root)
+    if os.path.exists(root) and not os.path.isdir(root):
+        raise ValueError(f"{root} exists and is not a dataset directory")
+    tmp = tempfile.mkdtemp(prefix=f'.{os.path.basename(root)}-', dir=os.path.dirname(root))
+    old = f'{tmp}.old'
+    total = 0
+    try:
+        for n, chunk in enumerate(chunks):
+            ds.write_dataset(
+                _to_table(chunk), tmp, format='parquet',
+                partitioning=PARTITIONING,
+                basename_template=f'part-{n:05d}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore')
+            total += len(chunk)
+        if os.path.exists(root):
+            os.replace(root, old)
+        try:
+            os.replace(tmp, root)
+        except BaseException:
+            if os.path.exists(old):
+                os.replace(old, root)
+            raise
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    shutil.rmtree(old, ignore_errors=True)
+    return total
+
+
+def dataset_exists(root=DATASET_DIR):
+    return os.path.isdir(root) and any(
+        f.endswith('.parquet') for _, _, files in os.walk(root) for f in files)
+
+
+def read_grid_dataset(root=DATASET_DIR, columns=None, states=None, months=None):
+    # Column pruning + partition pruning: only the requested files and
+    # column chunks are read from disk.
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+    filt = None
+    if states is not None:
+        filt = ds.field('state').isin(list(states))
+    if months is not None:
+        mf = ds.field('month').isin(list(months))
+        filt = mf if filt is None else filt & mf
+    cols = columns or [c for c in dataset.schema.names if c != 'month']
+    return compact(dataset.to_table(columns=cols, filter=filt).to_pandas())
+
+
+
+# ── Processed snapshot ────────────────────────────────────────────
+# The scored dataset is written once as uncompressed Arrow IPC and read back
+# through a memory map, so numeric columns are views onto the shared page
+# cache rather than per-process copies.
+def save_snapshot(df, path=SNAPSHOT_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.tmp"
+    feather.write_feather(df.reset_index(drop=True), tmp, compression='uncompressed')
+    os.replace(tmp, path)
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def snapshot_is_fresh(sources, path=SNAPSHOT_PATH):
+    if not os.path.exists(path):
+        return False
+    built = os.path.getmtime(path)
+    return all(os.path.getmtime(s) <= built for s in sources if os.path.exists(s))
+
+
+if __name__ == "__main__":
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else 'grid_data.csv'
+    raw = read_grid_dataset(path) if os.path.isdir(path) else pd.read_csv(path)
+    for k, v in memory_report(raw).items():
+        print(f"{k:<22} {v}")
@@ -0,0 +1,119 @@
+import math
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZE = 20
+CSV_CHUNK_ROWS = 100_000
+ORDER_CACHE_SIZE = 32
+
+# Sorted row positions per (table, data version, sort column, direction),
+# shared by every session. A page view is then one iloc over PAGE_SIZE rows.
+_orders = OrderedDict()
+_orders_lock = threading.Lock()
+
+
+def _sort_key(series, pos):
+    values = series.iloc[pos]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        if values.cat.ordered:
+            # ordered categoricals (risk_label) sort by their declared order
+            rank = np.arange(len(values.cat.categories))
+        else:
+            # rank categories once instead of comparing strings row by row
+            rank = np.argsort(np.argsort(values.cat.categories.to_numpy()))
+        return np.where(codes >= 0, rank[codes], len(rank)).astype(float)
+    return values.to_numpy(dtype=float, na_value=np.nan)
+
+
+def sorted_positions(df, select, sort_col, ascending, key, maxsize=ORDER_CACHE_SIZE):
+    """Positions of the rows where select(df) is True, ordered by sort_col."""
+    cache_key = (key, sort_col, ascending)
+    with _orders_lock:
+        if cache_key in _orders:
+            _orders.move_to_end(cache_key)
+            return _orders[cache_key]
+    pos = np.flatnonzero(np.asarray(select(df)))
+    keys = _sort_key(df[sort_col], pos)
+    # negate rather than reverse so ties keep row order and NaN stays last
+    pos = pos[np.argsort(keys if ascending else -keys, kind='stable')]
+    with _orders_lock:
+        _orders[cache_key] = pos
+        while len(_orders) > maxsize:
+            _orders.popitem(last=False)
+    return pos
+
+
+def _match(series, pos, keep):
+    # keep() is evaluated once per category for categorical columns
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        ok = np.asarray(keep(series.cat.categories.to_series()), dtype=bool)
+        codes = series.cat.codes.to_numpy()[pos]
+        return (codes >= 0) & ok[codes]
+    return np.asarray(keep(series.iloc[pos]), dtype=bool)
+
+
+def csv_file(df, pos, columns, chunk_rows=CSV_CHUNK_ROWS):
+    """CSV of df rows at pos, written chunk by chunk to a temp file and
+    returned as an open binary reader (a type st.download_button accepts)."""
+    with tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False) as out:
+        if not len(pos):
+            out.write(df[columns].head(0).to_csv(index=False).encode())
+        for i in range(0, len(pos), chunk_rows):
+            chunk = df.iloc[pos[i:i + chunk_rows]][columns]
+            out.write(chunk.to_csv(index=False, header=i == 0).encode())
+    reader = open(out.name, 'rb')
+    try:
+        os.unlink(out.name)     # the open handle keeps the data readable
+    except OSError:
+        pass
+    return reader
+
+
+def _options(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return sorted(series.cat.categories)
+    return sorted(series.dropna().unique())
+
+
+def paged_table(df, select, columns, key, sort_by, ascending=False,
+                download=None, page_size=PAGE_SIZE):
+    """Filterable, sortable, paginated view over the rows where select(df) is True.
+
+    key must change with the data (e.g. include the data version). Only the
+    visible page is materialised; the CSV in `download=(label, file_name)` is
+    built when the button is clicked.
+    """
+    name = key[0] if isinstance(key, tuple) else key
+    c1, c2, c3, c4 = st.columns([3, 3, 3, 1])
+    states = c1.multiselect("State", _options(df['state']), key=f"{name}_states")
+    search = c2.text_input("Feeder", key=f"{name}_search", placeholder="Search feeder ID")
+    sort_col = c3.selectbox("Sort by", columns, index=columns.index(sort_by), key=f"{name}_sort")
+    asc = c4.toggle("Asc", value=ascending, key=f"{name}_asc")
+
+    pos = sorted_positions(df, select, sort_col, asc, key)
+    if states:
+        pos = pos[_match(df['state'], pos, lambda v: v.isin(states))]
+    if search:
+        pos = pos[_match(df['feeder_id'], pos,
+                         lambda v: v.astype(str).str.contains(search, case=False, regex=False))]
+
+    pages = max(1, math.ceil(len(pos) / page_size))
+    page_key = f"{name}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = 1
+    page = st.number_input("Page", 1, pages, key=page_key)
+    shown = pos[(page - 1) * page_size:page * page_size]
+    st.dataframe(df.iloc[shown][columns], use_container_width=True, hide_index=True)
+    st.caption(f"{len(pos):,} rows · page {page} of {pages}")
+
+    if download:
+        label, file_name = download
+        st.download_button(label, lambda: csv_file(df, pos, columns), file_name,
+                           mime="text/csv", use_container_width=True, key=f"{name}_csv")
+    return pos
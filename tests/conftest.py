@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the repo root, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    """Point the model registry at an empty temporary directory."""
+    import ml_models
+    path = tmp_path / 'models'
+    monkeypatch.setattr(ml_models, 'MODEL_DIR', str(path))
+    monkeypatch.setattr(ml_models, 'LATEST_PATH', str(path / 'latest.json'))
+    monkeypatch.setattr(ml_models, '_loaded', {})
+    monkeypatch.setattr(ml_models, '_latest', (None, None))
+    return path
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from charts import decimate, sample_note
+
+
+def _frame(n, n_flagged, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'x': rng.random(n), 'y': rng.random(n),
+                         'flag': np.arange(n) < n_flagged})
+
+
+def test_note_claims_flagged_kept_only_when_true():
+    df = _frame(10_000, 300)
+    pts = decimate(df, 'x', 'y', 1_000, keep=df['flag'])
+    assert pts['flag'].sum() == 300
+    assert "all flagged points kept" in sample_note(len(pts), len(df), 300)
+
+    df = _frame(10_000, 3_000)
+    pts = decimate(df, 'x', 'y', 1_000, keep=df['flag'])
+    assert pts['flag'].sum() < 3_000
+    assert sample_note(len(pts), len(df), 3_000) == "Showing 1,000 of 10,000 points"
+
+
+def test_no_note_when_everything_shown():
+    assert sample_note(500, 500, 10) == ""
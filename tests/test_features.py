@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from data_generator import iter_grid_chunks
+from database import GridDatabase
+from features import (HISTORY_FEATURES, FeederFeatureCache, add_feeder_features,
+                      latest_with_history)
+from ingest import simulate_batch
+
+
+def _fleet(days, seed=0):
+    return pd.concat(iter_grid_chunks(10, days, seed), ignore_index=True)
+
+
+def test_seeded_cache_matches_full_history():
+    full = add_feeder_features(_fleet(40))
+    old = full[full['date'] < '2024-01-31'].drop(columns=HISTORY_FEATURES)
+    new = full[full['date'] >= '2024-01-31'].drop(columns=HISTORY_FEATURES).copy()
+    FeederFeatureCache().seed(old).update(new)
+    expected = full.loc[new.index, HISTORY_FEATURES].to_numpy()
+    np.testing.assert_allclose(new[HISTORY_FEATURES].to_numpy(), expected, rtol=1e-5)
+
+
+def test_live_history_features(tmp_path):
+    rng = np.random.default_rng(0)
+    with GridDatabase(str(tmp_path / 'grid.db')) as db:
+        for day in range(1, 11):
+            batch = simulate_batch(50, n_feeders=5, rng=rng)
+            for r in batch:
+                r['timestamp'] = f"2026-01-{day:02d}T{r['timestamp'][-8:]}"
+            db.insert_readings(batch)
+        recent = db.get_recent_per_feeder(7)
+        latest = latest_with_history(recent)
+
+    assert recent.groupby('feeder_id').size().max() == 7
+    assert len(latest) == 5
+    assert latest['loss_delta'].abs().sum() > 0
+    assert (latest['timestamp'].to_numpy() == recent.groupby('feeder_id')['timestamp'].max().to_numpy()).all()
+
+
+def test_nan_reading_stays_local():
+    df = pd.DataFrame({
+        'feeder_id': ['A'] * 5 + ['B'] * 5,
+        'date': list(pd.date_range('2024-01-01', periods=5)) * 2,
+        'loss_percentage': [10, np.nan, 12, 13, 14, 20, 22, 24, 26, 28],
+        'units_injected_kwh': 100.0, 'units_billed_kwh': 80.0,
+    })
+    add_feeder_features(df)
+    b = df[df['feeder_id'] == 'B']
+    np.testing.assert_allclose(b['loss_roll_mean'], [20, 21, 22, 23, 24])
+    assert (b['loss_zscore'].iloc[1:] != 0).all()
+    a = df[df['feeder_id'] == 'A']
+    np.testing.assert_allclose(a['loss_roll_mean'], [10, 10, 11, 35 / 3, 12.25])
@@ -0,0 +1,85 @@
+import os
+import threading
+
+import pytest
+
+import gemini_engine
+from gemini_engine import ResponseCache, StubModel
+
+
+class CountingStub(StubModel):
+    """StubModel that records how many calls are in flight at once."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self.in_flight = self.peak = 0
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            return super().generate_content(prompt, stream, request_options)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    monkeypatch.setattr(gemini_engine, 'cache', ResponseCache(str(tmp_path / 'cache.db')))
+    monkeypatch.setattr(gemini_engine, 'BACKOFF_BASE_SECONDS', 0.01)
+
+    def install(**kwargs):
+        model = CountingStub(**kwargs)
+        monkeypatch.setattr(gemini_engine, 'model', model)
+        monkeypatch.setattr(gemini_engine, 'MODEL_NAME', 'stub')
+        return model
+    return install
+
+
+ROW = {'state': 'Bihar', 'loss_percentage': 30, 'transformer_age_years': 25,
+       'load_factor': 0.8, 'temperature_celsius': 35, 'voltage_fluctuation': 4,
+       'is_suspicious': True, 'risk_label': 'HIGH', 'smart_meter_installed': False,
+       'outage_hours_monthly': 12}
+
+
+def _rows(n):
+    return [{**ROW, 'feeder_id': f'FEEDER_{i:03d}'} for i in range(n)]
+
+
+def test_timeouts_never_exceed_concurrency(stub):
+    model = stub(delay=0.5)
+    results = gemini_engine.run_batch_recommendations(
+        _rows(6), concurrency=2, timeout=0.1, max_retries=1)
+    assert model.peak <= 2
+    assert model.calls == 12
+    assert all(r['status'] == 'error' and 'TimeoutError' in r['text'] for r in results)
+
+
+def test_results_keep_input_order(stub):
+    model = stub(reply=lambda prompt: prompt.split('Feeder ID: ')[1].split()[0])
+    results = gemini_engine.run_batch_recommendations(_rows(5), concurrency=3)
+    assert [r['text'] for r in results] == [f'FEEDER_{i:03d}' for i in range(5)]
+    assert model.peak <= 3
+
+
+def test_missing_api_key_fails_clearly(monkeypatch):
+    monkeypatch.delenv(gemini_engine.API_KEY_NAME, raising=False)
+    with pytest.raises(RuntimeError, match=gemini_engine.API_KEY_NAME):
+        gemini_engine.get_api_key()
+
+
+def test_api_key_from_environment(monkeypatch):
+    monkeypatch.setenv(gemini_engine.API_KEY_NAME, 'test-key')
+    assert gemini_engine.get_api_key() == 'test-key'
+
+
+def test_import_has_no_filesystem_effects(tmp_path):
+    import subprocess
+    import sys
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', f'import sys; sys.path.insert(0, {root!r}); import gemini_engine'],
+                   cwd=tmp_path, check=True)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+import urllib.request
+
+import pytest
+
+import ingest
+from ingest import IngestPipeline, make_handler, simulate_batch, validate
+
+
+def _reading(**overrides):
+    return {**simulate_batch(1)[0], **overrides}
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    p = IngestPipeline(str(tmp_path / 'grid.db'), flush_interval=0.01)
+    yield p
+    if p._running:
+        p.close()
+
+
+@pytest.mark.parametrize('field, value', [
+    ('state', {'name': 'Bihar'}),
+    ('state', 'x' * 500),
+    ('timestamp', {'t': 1}),
+    ('timestamp', 'yesterday'),
+    ('smart_meter', {'installed': True}),
+    ('smart_meter', 'yes'),
+    ('outage_hours', {'h': 3}),
+    ('outage_hours', -1),
+    ('load_factor', '0.7'),
+    ('feeder_id', 7),
+    ('feeder_id', '<img src=x onerror=alert(1)>'),
+    ('feeder_id', ''),
+    ('state', '<script>alert(1)</script>'),
+])
+def test_validate_rejects_wrong_types(field, value):
+    assert validate(_reading(**{field: value})) is not None
+
+
+def test_validate_accepts_simulated_readings():
+    assert all(validate(r) is None for r in simulate_batch(200))
+    assert validate(_reading(timestamp='12:30:00')) is None
+
+
+def test_malformed_readings_never_reach_the_writer(pipeline):
+    bad = [_reading(state={'x': 1}), _reading(timestamp={'t': 1}),
+           _reading(smart_meter={'y': 2}), _reading(outage_hours={'z': 3})]
+    accepted, errors = pipeline.submit(simulate_batch(10) + bad)
+    assert accepted == 10
+    assert [e['index'] for e in errors] == [10, 11, 12, 13]
+    pipeline.close()
+    assert pipeline.stats['written'] == 10
+    assert pipeline.stats['rejected'] == 4
+
+
+def test_writer_survives_a_failing_batch(pipeline, monkeypatch):
+    real_insert = pipeline.db.insert_readings
+    calls = []
+
+    def flaky(readings):
+        calls.append(len(readings))
+        if len(calls) == 1:
+            raise ValueError("boom")
+        return real_insert(readings)
+
+    monkeypatch.setattr(pipeline.db, 'insert_readings', flaky)
+    pipeline.submit(simulate_batch(5))
+    _wait_for(lambda: calls)
+    pipeline.submit(simulate_batch(7))
+    _wait_for(lambda: pipeline.stats['written'])
+    assert pipeline.health()['writer_alive']
+    pipeline.close()
+    assert pipeline.stats['written'] == 7
+    assert pipeline.stats['rejected'] == 5
+
+
+def test_http_health_reports_writer(pipeline):
+    server = ingest.ThreadingHTTPServer(('127.0.0.1', 0), make_handler(pipeline))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    try:
+        body = json.dumps([_reading(state={'x': 1}), _reading()]).encode()
+        resp = urllib.request.urlopen(urllib.request.Request(f'{url}/readings', data=body))
+        assert resp.status == 202
+        assert json.loads(resp.read())['accepted'] == 1
+        health = json.loads(urllib.request.urlopen(f'{url}/health').read())
+        assert health['writer_alive'] is True
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _wait_for(cond, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+import pytest
+
+import ml_models
+from data_generator import iter_grid_chunks
+
+
+def _save(kind, key, mtime):
+    ml_models.save_model(kind, key, {'key': key})
+    path = ml_models._artifact_path(key)
+    os.utime(path, (mtime, mtime))
+
+
+def test_save_prunes_old_artifacts(model_dir):
+    for i in range(5):
+        _save('risk', f'risk-s-{i}', 1000 + i)
+    assert len(os.listdir(model_dir)) == ml_models.KEEP_ARTIFACTS + 1
+
+
+def test_prune_keeps_newest_per_kind(model_dir, monkeypatch):
+    monkeypatch.setattr(ml_models, 'KEEP_ARTIFACTS', 10)
+    for i in range(5):
+        _save('risk', f'risk-s-{i}', 1000 + i)
+    _save('anomaly', 'anomaly-s-0', 900)
+    ml_models.prune_models('risk', keep=2)
+    assert sorted(os.listdir(model_dir)) == [
+        'anomaly-s-0.joblib', 'latest.json', 'risk-s-3.joblib', 'risk-s-4.joblib']
+
+
+def test_prune_never_deletes_latest(model_dir, monkeypatch):
+    monkeypatch.setattr(ml_models, 'KEEP_ARTIFACTS', 10)
+    for i in range(4):
+        _save('risk', f'risk-s-{i}', 1000 + i)
+    # latest.json points at an artifact that is not among the newest
+    ml_models._write_latest('risk', 'risk-s-0')
+    assert ml_models.prune_models('risk', keep=1) == ['risk-s-2', 'risk-s-1']
+    assert os.path.exists(ml_models._artifact_path('risk-s-0'))
+    assert os.path.exists(ml_models._artifact_path('risk-s-3'))
+
+
+def _fleet(n_feeders=20, days=30, seed=0):
+    return pd.concat(iter_grid_chunks(n_feeders, days, seed), ignore_index=True)
+
+
+def test_single_class_top_up_keeps_risk_model(model_dir):
+    ml_models.train(_fleet())
+    before = ml_models._read_latest()
+
+    batch = _fleet(seed=1)
+    batch['transformer_age_years'] = 5          # no HIGH-risk rows at all
+    anomaly, risk = ml_models.update_models(batch, extra_trees=5)
+
+    after = ml_models._read_latest()
+    assert after['risk'] == before['risk']
+    assert after['anomaly'] != before['anomaly']
+    assert list(risk.classes_) == [0, 1]
+    scored = ml_models.score(_fleet(seed=2))
+    assert scored['failure_risk_score'].between(0, 1).all()
+
+
+def test_top_up_grows_both_forests(model_dir):
+    anomaly, risk = ml_models.train(_fleet())
+    n_anomaly, n_risk = anomaly[-1].n_estimators, risk.n_estimators
+    before = ml_models._read_latest()
+    anomaly, risk = ml_models.update_models(_fleet(seed=1), extra_trees=5)
+    assert anomaly[-1].n_estimators == n_anomaly + 5
+    assert risk.n_estimators == n_risk + 5
+    assert ml_models._read_latest()['risk'] != before['risk']
+
+
+def test_check_models_rejects_single_class_forest(model_dir):
+    anomaly, risk = ml_models.train(_fleet())
+    df = _fleet(seed=1)
+    df['transformer_age_years'] = 5
+    ml_models.ensure_feeder_features(df)
+    one_class = ml_models.fit_risk_model(df)
+    with pytest.raises(ValueError):
+        ml_models.check_models(anomaly, one_class,
+                               df[ml_models.ANOMALY_FEATURES].to_numpy(),
+                               df[ml_models.RISK_FEATURES].to_numpy())
+
+
+def test_retraining_on_seen_data_repoints_latest(model_dir):
+    a, b = _fleet(seed=0), _fleet(seed=1)
+    ml_models.train(a)
+    latest_a = ml_models._read_latest()
+    ml_models.train(b)
+    assert ml_models._read_latest() != latest_a
+    models = ml_models.train(_fleet(seed=0))
+    assert ml_models._read_latest() == latest_a
+    assert ml_models.latest_models() == models
@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+import pytest
+
+from data_generator import iter_grid_chunks
+from storage import read_grid_dataset, write_grid_dataset
+
+
+def _fleet(days):
+    return pd.concat(iter_grid_chunks(10, days, seed=0), ignore_index=True)
+
+
+def test_rewrite_replaces_previous_dataset(tmp_path):
+    root = tmp_path / 'grid_data'
+    write_grid_dataset(_fleet(60), root)
+    assert write_grid_dataset(_fleet(30), root) == 300
+    assert len(read_grid_dataset(root)) == 300
+    assert [p.name for p in tmp_path.iterdir()] == ['grid_data']
+
+
+def test_chunks_are_all_kept(tmp_path):
+    root = tmp_path / 'grid_data'
+    chunks = iter_grid_chunks(10, 30, seed=0, chunk_rows=60)
+    assert write_grid_dataset(chunks, root) == 300
+    assert len(read_grid_dataset(root)) == 300
+
+
+def test_refuses_to_replace_a_file(tmp_path):
+    path = tmp_path / 'grid_data.csv'
+    path.write_text('feeder_id\n')
+    with pytest.raises(ValueError):
+        write_grid_dataset(_fleet(5), path)
+    assert path.read_text() == 'feeder_id\n'
+    assert [p.name for p in tmp_path.iterdir()] == ['grid_data.csv']
+
+
+def test_failed_swap_restores_previous_dataset(tmp_path, monkeypatch):
+    root = tmp_path / 'grid_data'
+    write_grid_dataset(_fleet(60), root)
+    real_replace = os.replace
+
+    def fail_second_replace(src, dst):
+        if str(dst) == str(root) and not str(src).endswith('.old'):
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', fail_second_replace)
+    with pytest.raises(OSError):
+        write_grid_dataset(_fleet(30), root)
+    monkeypatch.undo()
+    assert len(read_grid_dataset(root)) == 600
+    assert [p.name for p in tmp_path.iterdir()] == ['grid_data']
@@ -0,0 +1,103 @@
+import time
+
+import pandas as pd
+import pytest
+
+import ml_models
+from data_generator import iter_grid_chunks
+from ingest import IngestPipeline, simulate_batch
+from stream_scoring import StreamScorer
+
+REQUIRED_ONLY = ("feeder_id", "loss_percentage", "units_injected", "units_billed")
+
+
+@pytest.fixture
+def models(model_dir):
+    return ml_models.train(pd.concat(iter_grid_chunks(20, 30, seed=0), ignore_index=True))
+
+
+def _partial(readings):
+    return [{k: r[k] for k in REQUIRED_ONLY} for r in readings]
+
+
+def test_partial_readings_are_skipped_not_fatal(models):
+    scorer = StreamScorer(models)
+    df = scorer.score_batch(_partial(simulate_batch(20)))
+    assert df.empty
+    assert scorer.skipped == 20
+    assert scorer.process(_partial(simulate_batch(5))) == []
+
+
+def test_mixed_batch_scores_complete_rows(models):
+    scorer = StreamScorer(models)
+    batch = simulate_batch(30)
+    df = scorer.score_batch(_partial(batch[:10]) + batch[10:])
+    assert len(df) == 20
+    assert scorer.skipped == 10
+    assert df['failure_risk_score'].between(0, 1).all()
+
+
+def test_failed_batch_does_not_disable_scoring(models, tmp_path):
+    scorer = StreamScorer(models, cooldown=0)
+    real_process = scorer.process
+    calls = []
+
+    def flaky(readings):
+        calls.append(len(readings))
+        if len(calls) == 1:
+            raise RuntimeError("model exploded")
+        return real_process(readings)
+
+    scorer.process = flaky
+    pipeline = IngestPipeline(str(tmp_path / 'grid.db'), flush_interval=0.01, scorer=scorer)
+    pipeline._score(simulate_batch(10))
+    pipeline._score(simulate_batch(200))
+    health = pipeline.health()
+    pipeline.close()
+    assert pipeline.scorer is scorer
+    assert health['scoring_errors'] == 1
+    assert scorer.scored == 200
+
+
+def test_missing_loss_never_enters_history(models):
+    scorer = StreamScorer(models)
+    batch = simulate_batch(200, n_feeders=5)
+    batch[0]['loss_percentage'] = None
+    df = scorer.score_batch(batch)
+    assert len(df) == 199
+    assert scorer.skipped == 1
+    assert not df['loss_roll_mean'].isna().any()
+    assert not scorer.history.tail['loss_percentage'].isna().any()
+    assert (df.groupby('feeder_id')['loss_zscore'].apply(lambda z: (z.iloc[1:] != 0).all())).all()
+
+
+class SlowScorer:
+    """Stands in for StreamScorer; every batch takes `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.batches = 0
+        self.skipped = 0
+        self.us_per_reading = 0.0
+
+    def process(self, readings):
+        time.sleep(self.delay)
+        self.batches += 1
+        return []
+
+
+def test_slow_scoring_never_holds_up_writes(tmp_path):
+    scorer = SlowScorer(delay=0.2)
+    pipeline = IngestPipeline(str(tmp_path / 'grid.db'), flush_interval=0.01,
+                              write_rows=100, scorer=scorer, max_score_batches=1)
+    t0 = time.monotonic()
+    for _ in range(20):
+        pipeline.submit(simulate_batch(100))
+    while pipeline.stats['written'] < 2000:
+        assert time.monotonic() - t0 < 2, "writes waited on scoring"
+        time.sleep(0.01)
+    health = pipeline.health()
+    pipeline.close()
+    assert health['scorer_alive']
+    assert health['scoring_dropped'] > 0
+    assert scorer.batches * 100 + pipeline.stats['scoring_dropped'] == 2000
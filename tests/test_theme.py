@@ -0,0 +1,19 @@
+from giip_page import ALERT_CARD, SENSOR_CARD
+from theme import render_cards
+
+
+def test_cards_escape_ingested_text():
+    out = render_cards(ALERT_CARD, [{
+        "type": "THEFT", "severity": "HIGH", "icon": "🚨", "sc": "#dc2626", "sb": "#dc262622",
+        "feeder": "<img src=x onerror=alert(1)>", "state": "<b>UP</b>",
+        "detail": "Loss 31% <script>alert(1)</script>"}])
+    assert "<img" not in out and "<script>" not in out and "<b>" not in out
+    assert "&lt;img src=x onerror=alert(1)&gt;" in out
+
+
+def test_numbers_keep_their_format():
+    out = render_cards(SENSOR_CARD, [{
+        "feeder_id": "FEEDER_001", "state": "Bihar", "loss_percentage": 12.345,
+        "voltage": 230.1, "load_factor": 0.7, "power_kw": 100, "temperature": 30,
+        "timestamp": "12:00:00", "c": "#00C896", "lc": "#00C896", "icon": "⚡", "smart": "✅"}])
+    assert "12.3%" in out and "FEEDER_001 · Bihar" in out
@@ -3,6 +3,10 @@ theme.py — GridSense AI Design System (Streamlit-native approach)
 No HTML div wrapping around st.plotly_chart — uses CSS to style
 Streamlit's own containers instead.
 """
+import re
+import html
+import numbers
+from functools import lru_cache
 import streamlit as st
 
 DARK_VARS = """
@@ -350,9 +354,41 @@ hr {{ border-color: var(--border-subtle) !important; margin: 14px 0 !important;
 """
 
 
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};>,])\s*", r"\1", css)
+    return re.sub(r":\s+", ":", css).strip()
+
+
+# Both variants are compiled once per process; a rerun only picks one.
+THEME_CSS = {
+    True:  minify_css(build_css(DARK_VARS)),
+    False: minify_css(build_css(LIGHT_VARS)),
+}
+
+
 def inject_theme():
     dark = st.session_state.get("dark_mode", True)
-    st.markdown(build_css(DARK_VARS if dark else LIGHT_VARS), unsafe_allow_html=True)
+    st.markdown(THEME_CSS[dark], unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=1024)
+def _render(template: str, fields: tuple) -> str:
+    return template.format(**dict(fields))
+
+
+def _escape(value):
+    # Numbers stay numbers so format specs like {loss_percentage:.1f} work
+    return value if isinstance(value, numbers.Number) else html.escape(str(value))
+
+
+def render_cards(template: str, rows: list) -> str:
+    """Fill a str.format card template once per row; repeated rows (same
+    alert, same action) come straight from the cache. Every non-numeric
+    value is HTML-escaped, since rows may carry ingested text."""
+    return "".join(_render(template, tuple((k, _escape(v)) for k, v in r.items()))
+                   for r in rows)
 
 
 def plotly_dark_layout(fig, height=300):